@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Book Catalog Benchmark
+Compares the linear scans book.py used to do over the BOOKS list with the hash
+indexes in BookCatalog, at growing catalog sizes up to 1M books.
+
+Synthetic books have unique titles, AUTHORS distinct authors and CATEGORIES
+categories, so an author lookup returns about n / AUTHORS books and a category
+lookup about n / CATEGORIES. Scan timings grow with n; index timings should stay
+flat for title lookups and track the result size k for the others.
+
+Run from the day1 directory:
+  python bench_book_catalog.py
+"""
+
+import random
+import time
+
+from book_catalog import BookCatalog
+
+SIZES = (10_000, 100_000, 1_000_000)
+AUTHORS = 100_000
+CATEGORIES = 1_000
+LOOKUPS = 200
+SCAN_LOOKUPS = 5
+
+
+def make_books(n: int) -> list[dict]:
+    return [
+        {"title": f"Title {i}", "author": f"Author {i % AUTHORS}", "category": f"Category {i % CATEGORIES}"}
+        for i in range(n)
+    ]
+
+
+# The loops book.py ran before the catalog
+def scan_title(books, title):
+    for book in books:
+        if book.get("title").casefold() == title.casefold():
+            return book
+
+
+def scan_author(books, author):
+    return [book for book in books if book.get("author").casefold() == author.casefold()]
+
+
+def scan_category(books, category):
+    return [book for book in books if book.get("category").casefold() == category.casefold()]
+
+
+def scan_author_category(books, author, category):
+    return [
+        book
+        for book in books
+        if book.get("author").casefold() == author.casefold() and book.get("category").casefold() == category.casefold()
+    ]
+
+
+def per_call_us(fn, args_list) -> float:
+    started = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1e6
+
+
+def bench_size(n: int) -> list:
+    books = make_books(n)
+    started = time.perf_counter()
+    catalog = BookCatalog(books)
+    build_s = time.perf_counter() - started
+
+    rng = random.Random(n)
+    ids = [rng.randrange(n) for _ in range(LOOKUPS)]
+    titles = [(f"title {i}",) for i in ids]  # lower case: lookups are case-insensitive
+    authors = [(f"AUTHOR {i % AUTHORS}",) for i in ids]
+    categories = [(f"category {i % CATEGORIES}",) for i in ids]
+    pairs = [(f"author {i % AUTHORS}", f"category {i % CATEGORIES}") for i in ids]
+
+    rows = []
+    for name, scan, index, args in (
+        ("title", scan_title, catalog.get_by_title, titles),
+        ("author", scan_author, catalog.by_author, authors),
+        ("category", scan_category, catalog.by_category, categories),
+        ("author+category", scan_author_category, catalog.by_author_category, pairs),
+    ):
+        scan_us = per_call_us(lambda *a: scan(books, *a), args[:SCAN_LOOKUPS])
+        index_us = per_call_us(index, args)
+        result = index(*args[0])
+        k = len(result) if isinstance(result, list) else 1
+        rows.append((name, k, scan_us, index_us))
+
+    # Changes: create, update (moves author and category), delete
+    new_books = [{"title": f"New {i}", "author": "Author New", "category": "Category New"} for i in range(LOOKUPS)]
+    add_us = per_call_us(catalog.add, [(b,) for b in new_books])
+    updates = [({"title": f"Title {i}", "author": "Author Moved", "category": "Category Moved"},) for i in ids]
+    update_us = per_call_us(catalog.update, updates)
+    delete_us = per_call_us(catalog.delete_by_title, titles)
+    return rows, build_s, (add_us, update_us, delete_us)
+
+
+def main() -> None:
+    print(f"{AUTHORS} authors, {CATEGORIES} categories; scan times over {SCAN_LOOKUPS} lookups, index over {LOOKUPS}\n")
+    for n in SIZES:
+        rows, build_s, (add_us, update_us, delete_us) = bench_size(n)
+        print(f"n = {n:,}  (index build {build_s:.2f}s)")
+        print(f"  {'lookup':<17}{'k':>6}{'scan us':>14}{'index us':>11}{'speedup':>11}")
+        for name, k, scan_us, index_us in rows:
+            print(f"  {name:<17}{k:>6}{scan_us:>14,.0f}{index_us:>11.1f}{scan_us / index_us:>10,.0f}x")
+        print(f"  add {add_us:.1f} us, update {update_us:.1f} us, delete {delete_us:.1f} us per call\n")
+
+
+if __name__ == "__main__":
+    main()
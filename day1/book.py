@@ -1,6 +1,10 @@
 from fastapi import Body, FastAPI
 
+from book_catalog import BookCatalog
+from compression import CompressionMiddleware
+
 app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 
 BOOKS = [
@@ -12,67 +16,46 @@ BOOKS = [
     {"title": "Title Six", "author": "Author Two", "category": "math"},
 ]
 
+# Seed data; the running app reads and changes the indexed catalog
+catalog = BookCatalog(BOOKS)
+
 
 @app.get("/books")
 async def read_all_books():
-    return BOOKS
+    return catalog.all()
 
 
 @app.get("/books/{book_title}")
 async def read_book(book_title: str):
-    for book in BOOKS:
-        if book.get("title").casefold() == book_title.casefold():
-            return book
+    return catalog.get_by_title(book_title)
 
 
 @app.get("/books/")
 async def read_category_by_query(category: str):
-    books_to_return = []
-    for book in BOOKS:
-        if book.get("category").casefold() == category.casefold():
-            books_to_return.append(book)
-    return books_to_return
+    return catalog.by_category(category)
 
 
 # Get all books from a specific author using path or query parameters
 @app.get("/books/byauthor/")
 async def read_books_by_author_path(author: str):
-    books_to_return = []
-    for book in BOOKS:
-        if book.get("author").casefold() == author.casefold():
-            books_to_return.append(book)
-
-    return books_to_return
+    return catalog.by_author(author)
 
 
 @app.get("/books/{book_author}/")
 async def read_author_category_by_query(book_author: str, category: str):
-    books_to_return = []
-    for book in BOOKS:
-        if (
-            book.get("author").casefold() == book_author.casefold()
-            and book.get("category").casefold() == category.casefold()
-        ):
-            books_to_return.append(book)
-
-    return books_to_return
+    return catalog.by_author_category(book_author, category)
 
 
 @app.post("/books/create_book")
 async def create_book(new_book=Body()):
-    BOOKS.append(new_book)
+    catalog.add(new_book)
 
 
 @app.put("/books/update_book")
 async def update_book(updated_book=Body()):
-    for i in range(len(BOOKS)):
-        if BOOKS[i].get("title").casefold() == updated_book.get("title").casefold():
-            BOOKS[i] = updated_book
+    catalog.update(updated_book)
 
 
 @app.delete("/books/delete_book/{book_title}")
 async def delete_book(book_title: str):
-    for i in range(len(BOOKS)):
-        if BOOKS[i].get("title").casefold() == book_title.casefold():
-            BOOKS.pop(i)
-            break
+    catalog.delete_by_title(book_title)
@@ -0,0 +1,125 @@
+"""
+In-memory book catalog with hash indexes.
+
+Books are kept in insertion order, keyed by an internal slot number, and indexed by
+casefolded title, author, category and (author, category). Each index maps a key
+to the slots holding it, in catalog order (a dict used as an ordered set), so
+lookups return a bucket as it is, without sorting.
+
+    lookup by title                  O(1)
+    lookup by author / category      O(k), k = number of matching books
+    add / delete                     O(1)
+    update by title                  O(k), k = books with that title
+                                     (+ O(m log m) per author / category change,
+                                     m = books under the new key)
+
+Keys are casefolded once, when a book is added, instead of on every comparison.
+"""
+
+
+def _fold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+class BookCatalog:
+    def __init__(self, books=()) -> None:
+        self._books: dict[int, dict] = {}
+        self._next_slot = 0
+        self._by_title: dict = {}
+        self._by_author: dict = {}
+        self._by_category: dict = {}
+        self._by_author_category: dict = {}
+        for book in books:
+            self.add(book)
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def all(self) -> list[dict]:
+        return list(self._books.values())
+
+    # ---------- indexes ----------
+
+    def _index_keys(self, book: dict):
+        author, category = _fold(book.get("author")), _fold(book.get("category"))
+        return (
+            (self._by_title, _fold(book.get("title"))),
+            (self._by_author, author),
+            (self._by_category, category),
+            (self._by_author_category, (author, category)),
+        )
+
+    def _index(self, slot: int, book: dict) -> None:
+        for index, key in self._index_keys(book):
+            index.setdefault(key, {})[slot] = None
+
+    def _unindex(self, slot: int, book: dict) -> None:
+        for index, key in self._index_keys(book):
+            self._remove(index, key, slot)
+
+    @staticmethod
+    def _remove(index: dict, key, slot: int) -> None:
+        slots = index[key]
+        del slots[slot]
+        if not slots:
+            del index[key]
+
+    @staticmethod
+    def _insert(index: dict, key, slot: int) -> None:
+        """Add slot under key, keeping the bucket in slot (catalog) order."""
+        slots = index.get(key)
+        if not slots or next(reversed(slots)) < slot:
+            index.setdefault(key, {})[slot] = None
+        else:
+            # An update moved an older book here: rebuild this one bucket in order
+            index[key] = dict.fromkeys(sorted([*slots, slot]))
+
+    def _lookup(self, index: dict, key) -> list[dict]:
+        return [self._books[slot] for slot in index.get(key, ())]
+
+    # ---------- queries ----------
+
+    def get_by_title(self, title: str) -> dict | None:
+        """First book added with this title (case-insensitive)."""
+        slots = self._by_title.get(_fold(title))
+        return self._books[next(iter(slots))] if slots else None
+
+    def by_author(self, author: str) -> list[dict]:
+        return self._lookup(self._by_author, _fold(author))
+
+    def by_category(self, category: str) -> list[dict]:
+        return self._lookup(self._by_category, _fold(category))
+
+    def by_author_category(self, author: str, category: str) -> list[dict]:
+        return self._lookup(self._by_author_category, (_fold(author), _fold(category)))
+
+    # ---------- changes ----------
+
+    def add(self, book: dict) -> None:
+        slot = self._next_slot
+        self._next_slot += 1
+        self._books[slot] = book
+        self._index(slot, book)
+
+    def update(self, book: dict) -> int:
+        """Replace every book with the same title; returns how many were replaced."""
+        slots = list(self._by_title.get(_fold(book.get("title")), ()))
+        new_keys = self._index_keys(book)
+        for slot in slots:
+            old_keys = self._index_keys(self._books[slot])
+            self._books[slot] = book
+            # Only move the slot in indexes whose key changed (author or category)
+            for (index, old_key), (_, new_key) in zip(old_keys, new_keys):
+                if old_key != new_key:
+                    self._remove(index, old_key, slot)
+                    self._insert(index, new_key, slot)
+        return len(slots)
+
+    def delete_by_title(self, title: str) -> bool:
+        """Delete the first book with this title; returns False if there was none."""
+        slots = self._by_title.get(_fold(title))
+        if not slots:
+            return False
+        slot = next(iter(slots))
+        self._unindex(slot, self._books.pop(slot))
+        return True
@@ -1,6 +1,8 @@
 from sre_parse import SUCCESS
 from fastapi import Body, FastAPI
 
+from compression import CompressionMiddleware
+
 books = [
     {"title": "The Alchemist", "author": "Paulo Coelho", "category": "Fiction"},
     {"title": "1984", "author": "George Orwell", "category": "Science Fiction"},
@@ -44,6 +46,7 @@ books = [
 ]
 
 app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 
 @app.get("/books")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Book Filter Benchmark
+Compares GET /books/ filtering the way books.py used to do it (list comprehensions
+over Books objects, one pass per filter) with BookStore.search(), using NumPy masks
+over the rating / published_date columns and, for reference, the pure-Python
+fallback search() uses when NumPy is missing.
+
+Queries, from selective to broad:
+  exact      rating == 3 and published_date == 1950
+  range      rating >= 14 and published after 2020
+  broad      rating >= 8 (about half the catalog)
+
+Times cover producing the list of Books the endpoint returns, not JSON encoding.
+Run from the day2 directory:
+  python bench_book_filters.py [books ...]
+"""
+
+import random
+import sys
+import time
+
+import book_store
+from book_store import Books, BookStore
+
+SIZES = (1_000_000, 4_000_000)
+REPEAT = 3
+
+QUERIES = (
+    ("exact", {"rating": 3, "published_date": 1950}),
+    ("range", {"rating_gte": 14, "published_after": 2020}),
+    ("broad", {"rating_gte": 8}),
+)
+
+
+def make_books(n: int) -> list:
+    rng = random.Random(n)
+    return [
+        Books(i, f"Book title {i}", "Author", "Fiction", rng.randint(1, 15), rng.randint(1800, 2024))
+        for i in range(1, n + 1)
+    ]
+
+
+def comprehension_search(books, rating=None, rating_gte=None, published_date=None, published_after=None):
+    """One comprehension per filter, as books.py did (extended to the range filters)."""
+    books_to_return = books
+    if rating:
+        books_to_return = [book for book in books_to_return if book.rating == rating]
+    if rating_gte:
+        books_to_return = [book for book in books_to_return if book.rating >= rating_gte]
+    if published_date:
+        books_to_return = [book for book in books_to_return if book.published_date == published_date]
+    if published_after:
+        books_to_return = [book for book in books_to_return if book.published_date > published_after]
+    return books_to_return
+
+
+def best_ms(fn) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, len(result)
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    numpy = book_store.np
+    if numpy is None:
+        print("NumPy is not installed: only the comprehensions and the pure-Python search run\n")
+    print(f"{'books':>10}  {'query':<7}{'matches':>9}{'lists ms':>10}{'python ms':>11}{'numpy ms':>10}{'numpy q/s':>11}{'speedup':>9}")
+    for n in sizes:
+        books = make_books(n)
+        store = BookStore(books)
+        for name, query in QUERIES:
+            lists_ms, matches = best_ms(lambda: comprehension_search(books, **query))
+            book_store.np = None
+            python_ms, _ = best_ms(lambda: store.search(**query))
+            book_store.np = numpy
+            if numpy is None:
+                print(f"{n:>10,}  {name:<7}{matches:>9,}{lists_ms:>10.1f}{python_ms:>11.1f}")
+                continue
+            numpy_ms, _ = best_ms(lambda: store.search(**query))
+            print(
+                f"{n:>10,}  {name:<7}{matches:>9,}{lists_ms:>10.1f}{python_ms:>11.1f}{numpy_ms:>10.1f}"
+                f"{1000 / numpy_ms:>11.1f}{lists_ms / numpy_ms:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
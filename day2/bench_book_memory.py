@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Book Memory Benchmark
+Measures memory per million books for three ways of holding the catalog:
+
+  objects    the original Books class: one object with a __dict__ per book,
+             in an id -> book dict
+  slots      Books as a slots dataclass (no __dict__), in an id -> book dict
+  columnar   BookStore: array columns for id / rating / published_date,
+             interned author and description strings
+
+Books get unique titles, AUTHORS distinct authors and a handful of descriptions.
+Strings are built per book (as they would be when parsed from request bodies), so
+only the columnar store shares the repeated ones. Memory is what tracemalloc sees
+allocated after building the catalog.
+
+Memory isn't free to win back: the columnar store builds a Books object for every
+book it returns, on every request. The "all ms" column is the time to produce the
+full list GET / returns (best of REPEAT, outside tracemalloc); broad searches pay
+the same per matching book.
+
+Run from the day2 directory:
+  python bench_book_memory.py [books]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from book_store import Books, BookStore
+
+BOOKS = 1_000_000
+AUTHORS = 50_000
+REPEAT = 3
+DESCRIPTIONS = ("Fiction", "Science Fiction", "Fantasy", "Technology", "Non-Fiction")
+
+
+class PlainBooks:
+    """Books as it was: a regular class with a per-instance __dict__."""
+
+    def __init__(self, id, title, author, description, rating, published_date) -> None:
+        self.id = id
+        self.title = title
+        self.author = author
+        self.description = description
+        self.rating = rating
+        self.published_date = published_date
+
+
+def generate(record_type, n: int):
+    for i in range(1, n + 1):
+        yield record_type(
+            i,
+            f"Book title {i}",
+            f"Author {i % AUTHORS}",
+            "".join(DESCRIPTIONS[i % len(DESCRIPTIONS)]),  # a fresh copy, like a parsed body
+            i % 15 + 1,
+            1800 + i % 225,
+        )
+
+
+def build_objects(n: int):
+    return {book.id: book for book in generate(PlainBooks, n)}
+
+
+def build_slots(n: int):
+    return {book.id: book for book in generate(Books, n)}
+
+
+def build_columnar(n: int):
+    return BookStore(generate(Books, n))
+
+
+def list_all(catalog) -> list:
+    """What GET / returns: every book, as Books-like objects."""
+    return catalog.all() if isinstance(catalog, BookStore) else list(catalog.values())
+
+
+def measure(build, n: int) -> tuple[int, float]:
+    gc.collect()
+    tracemalloc.start()
+    catalog = build(n)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        list_all(catalog)
+        best = min(best, time.perf_counter() - started)
+    del catalog
+    return used, best * 1000
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else BOOKS
+    print(f"{n:,} books, {AUTHORS:,} authors\n")
+    print(f"{'storage':<10}{'total MB':>10}{'MB per 1M books':>17}{'all ms':>10}")
+    baseline = None
+    for name, build in (("objects", build_objects), ("slots", build_slots), ("columnar", build_columnar)):
+        used, all_ms = measure(build, n)
+        baseline = baseline or used
+        # bytes per book == MB per million books
+        print(f"{name:<10}{used / 1e6:>10.1f}{used / n:>17.1f}{all_ms:>10.1f}   ({used / baseline:.0%} of objects)")
+
+
+if __name__ == "__main__":
+    main()
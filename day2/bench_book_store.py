@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Book Store Benchmark
+Compares the id lookups books.py used to do (scan the BOOKS list for a matching id,
+BOOKS.pop(i) to delete) with the id-keyed BookStore, at catalog sizes from 10k to
+10M books. Scan and pop times grow with n; store times should stay flat.
+
+Each size needs about 250 bytes per book in memory (10M books: ~2.5 GB). Pass sizes
+on the command line to pick others.
+
+Run from the day2 directory:
+  python bench_book_store.py [size ...]
+"""
+
+import random
+import sys
+import time
+
+from book_store import BookStore
+from book_store import Books
+
+SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+OPS = 1_000
+SCAN_OPS = 5
+
+
+def make_books(n: int) -> list:
+    return [Books(i, "Title", "Author", "Fiction", i % 15 + 1, 1900 + i % 125) for i in range(1, n + 1)]
+
+
+# What books.py did before the store
+def scan_get(books, book_id):
+    for book in books:
+        if book.id == book_id:
+            return book
+
+
+def scan_update(books, new_book):
+    for i, item in enumerate(books):
+        if item.id == new_book.id:
+            books[i] = new_book
+            return
+
+
+def list_create(books, new_book):
+    new_book.id = 1 if len(books) == 0 else books[-1].id + 1
+    books.append(new_book)
+
+
+def scan_delete(books, book_id):
+    for i, book in enumerate(books):
+        if book.id == book_id:
+            return books.pop(i)
+
+
+def new_book():
+    return Books(None, "New", "Author", "Fiction", 5, 2000)
+
+
+def per_call_us(fn, args_list) -> float:
+    started = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1e6
+
+
+def bench_size(n: int) -> list:
+    books = make_books(n)
+    store = BookStore(books)
+    rng = random.Random(n)
+    # Distinct ids, so each delete finds its book
+    ids = rng.sample(range(1, n + 1), OPS)
+    updates = [Books(i, "Updated", "Author", "Fiction", 5, 2000) for i in ids]
+
+    return [
+        ("get", per_call_us(lambda i: scan_get(books, i), [(i,) for i in ids[:SCAN_OPS]]),
+         per_call_us(store.get, [(i,) for i in ids])),
+        ("update", per_call_us(lambda b: scan_update(books, b), [(b,) for b in updates[:SCAN_OPS]]),
+         per_call_us(store.replace, [(b,) for b in updates])),
+        ("delete", per_call_us(lambda i: scan_delete(books, i), [(i,) for i in ids[:SCAN_OPS]]),
+         per_call_us(store.delete, [(i,) for i in ids])),
+        ("create", per_call_us(lambda b: list_create(books, b), [(new_book(),) for _ in range(OPS)]),
+         per_call_us(store.create, [(new_book(),) for _ in range(OPS)])),
+    ]
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"list scan timed over {SCAN_OPS} ops, store over {OPS}\n")
+    print(f"{'books':>12}  {'op':<8}{'list us':>14}{'store us':>11}{'speedup':>11}")
+    for n in sizes:
+        for op, list_us, store_us in bench_size(n):
+            print(f"{n:>12,}  {op:<8}{list_us:>14,.1f}{store_us:>11.2f}{list_us / store_us:>10,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Top-k Benchmark
+Times "the 20 highest-rated books published after 1999" and similar ordered
+queries answered three ways:
+
+  sort       filter every book, sort the matches, take the first 20 (what a client
+             of GET /books/ had to do)
+  search     BookStore.search() for the filter, then sort and slice
+  index      BookStore.top(): bisect into the sorted index and walk 20 keys
+
+Also shows deep pagination (page 50 via the cursor from page 49) and what the
+sorted indexes add to create / update / delete.
+
+Run from the day2 directory:
+  python bench_book_top.py [books ...]
+"""
+
+import random
+import sys
+import time
+
+from book_store import Books, BookStore
+
+SIZES = (100_000, 1_000_000)
+LIMIT = 20
+REPEAT = 3
+OPS = 200
+
+QUERIES = (
+    ("top rated since 2000", "rating", {"published_after": 1999}),
+    ("newest rated >= 12", "published_date", {"rating_gte": 12}),
+    ("newest before 1900", "published_date", {"published_before": 1900}),
+)
+
+
+def make_books(n: int) -> list:
+    rng = random.Random(n)
+    return [
+        Books(i, f"Book title {i}", "Author", "Fiction", rng.randint(1, 15), rng.randint(1800, 2024))
+        for i in range(1, n + 1)
+    ]
+
+
+def matches(book, rating_gte=None, published_after=None, published_before=None) -> bool:
+    return (
+        (rating_gte is None or book.rating >= rating_gte)
+        and (published_after is None or book.published_date > published_after)
+        and (published_before is None or book.published_date < published_before)
+    )
+
+
+def best_ms(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def per_call_us(fn, args_list) -> float:
+    started = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1e6
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for n in sizes:
+        books = make_books(n)
+        store = BookStore(books)
+        print(f"n = {n:,}")
+        print(f"  {'query':<24}{'sort ms':>10}{'search ms':>11}{'index ms':>10}{'page 50 ms':>12}")
+        for name, order_by, query in QUERIES:
+            key = lambda book: (getattr(book, order_by), book.id)
+            expected = sorted((b for b in books if matches(b, **query)), key=key, reverse=True)[:LIMIT]
+            top, _ = store.top(order_by=order_by, limit=LIMIT, **query)
+            assert [b.id for b in top] == [b.id for b in expected]
+
+            sort_ms = best_ms(lambda: sorted((b for b in books if matches(b, **query)), key=key, reverse=True)[:LIMIT])
+            search_ms = best_ms(lambda: sorted(store.search(**query), key=key, reverse=True)[:LIMIT])
+            index_ms = best_ms(lambda: store.top(order_by=order_by, limit=LIMIT, **query))
+            # Time only the 50th page: resume from the cursor page 49 returned
+            _, cursor = store.top(order_by=order_by, limit=LIMIT * 49, **query)
+            page_ms = best_ms(lambda: store.top(order_by=order_by, limit=LIMIT, cursor=cursor, **query))
+            print(f"  {name:<24}{sort_ms:>10.1f}{search_ms:>11.1f}{index_ms:>10.3f}{page_ms:>12.3f}")
+
+        rng = random.Random(0)
+        new = [(Books(None, "New", "Author", "Fiction", rng.randint(1, 15), rng.randint(1800, 2024)),) for _ in range(OPS)]
+        ids = rng.sample(range(1, n + 1), OPS)
+        updates = [(Books(i, "Updated", "Author", "Fiction", rng.randint(1, 15), rng.randint(1800, 2024)),) for i in ids]
+        create_us = per_call_us(store.create, new)
+        update_us = per_call_us(store.replace, updates)
+        delete_us = per_call_us(store.delete, [(i,) for i in ids])
+        print(f"  with index upkeep: create {create_us:.1f} us, update {update_us:.1f} us, delete {delete_us:.1f} us\n")
+
+
+if __name__ == "__main__":
+    main()
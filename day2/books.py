@@ -1,23 +1,8 @@
-from typing import Optional
+from typing import Literal, Optional
 from fastapi import Path, Query, FastAPI, HTTPException, status
 from pydantic import BaseModel, Field
-
-
-class Books:
-    id: int
-    title: str
-    author: str
-    description: str
-    rating: int
-    published_date: int
-
-    def __init__(self, id, title, author, description, rating, published_date) -> None:
-        self.id = id
-        self.title = title
-        self.author = author
-        self.description = description
-        self.rating = rating
-        self.published_date = published_date
+from book_store import Books, BookStore
+from compression import CompressionMiddleware
 
 
 class BookRequest(BaseModel):
@@ -28,6 +13,7 @@ class BookRequest(BaseModel):
     author: str = Field(min_length=1)
     description: str = Field(min_length=1, max_length=100)
     rating: int = Field(gt=0, lt=16)
+    published_date: int = Field(gt=0, lt=10000)
 
     model_config = {
         "json_schema_extra": {
@@ -36,7 +22,7 @@ class BookRequest(BaseModel):
                 "author": "Add name of author",
                 "description": "A new description of a book",
                 "rating": 5,
-                "published_date": "Date on which this book was published",
+                "published_date": 2012,
             }
         }
     }
@@ -166,27 +152,71 @@ BOOKS = [
 ]
 
 
+# Seed data; the running app reads and changes the id-keyed store
+book_store = BookStore(BOOKS)
+
+
 app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 
 @app.get("/")
 def get_books():
-    return BOOKS
+    return book_store.all()
 
 
 @app.post("/create-book", status_code=status.HTTP_201_CREATED)
 async def create_book(book_request: BookRequest):
     new_book = Books(**book_request.model_dump())
-    new_book.id = 1 if len(BOOKS) == 0 else BOOKS[-1].id + 1
-    BOOKS.append(new_book)
-    return new_book
+    return book_store.create(new_book)
+
+
+# Declared before /books/{book_id}, which would otherwise match "top"
+@app.get(
+    "/books/top",
+    summary="Top Books by Rating or Publish Date",
+    status_code=status.HTTP_200_OK,
+)
+async def get_top_books(
+    order_by: Literal["rating", "published_date"] = Query(default="rating"),
+    limit: int = Query(default=20, gt=0, le=100),
+    descending: bool = Query(default=True),
+    cursor: Optional[int] = Query(default=None),
+    rating: Optional[int] = Query(default=None, gt=0, lt=16),
+    rating_gte: Optional[int] = Query(default=None, gt=0, lt=16),
+    publish_date: Optional[int] = Query(default=None),
+    published_after: Optional[int] = Query(default=None),
+    published_before: Optional[int] = Query(default=None),
+):
+    """
+    Books in rating or publish date order, read from a sorted index.
+
+    - **order_by**: `rating` or `published_date`
+    - **limit**: Books per page (1-100)
+    - **descending**: Highest first (default); ties go to the newest book
+    - **cursor**: `next_cursor` from the previous page, to continue from there
+    - Filters as in **/books/**, e.g. the 20 highest-rated books published since 2000:
+      `/books/top?order_by=rating&published_after=1999`
+    """
+    books, next_cursor = book_store.top(
+        order_by=order_by,
+        limit=limit,
+        descending=descending,
+        cursor=cursor,
+        rating=rating,
+        rating_gte=rating_gte,
+        published_date=publish_date,
+        published_after=published_after,
+        published_before=published_before,
+    )
+    return {"books": books, "next_cursor": next_cursor}
 
 
 @app.get("/books/{book_id}", status_code=status.HTTP_200_OK)
 async def get_book(book_id: int = Path(gt=0)):
-    for book in BOOKS:
-        if book.id == book_id:
-            return book
+    book = book_store.get(book_id)
+    if book is not None:
+        return book
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -201,29 +231,28 @@ async def get_book(book_id: int = Path(gt=0)):
 )
 async def get_books_by_rating(
     rating: Optional[int] = Query(default=None, gt=0, lt=16),
+    rating_gte: Optional[int] = Query(default=None, gt=0, lt=16),
     publish_date: Optional[int] = Query(default=None),
+    published_after: Optional[int] = Query(default=None),
+    published_before: Optional[int] = Query(default=None),
 ):
     """
     Search for books using optional filters.
 
     You can filter by:
     - **rating**: Book rating (1-15)
+    - **rating_gte**: Minimum rating (e.g., 4 for books rated 4 or higher)
     - **publish_date**: Year of publication (e.g., 2015)
-    - **both**: Combine filters to narrow results
+    - **published_after** / **published_before**: Published strictly after / before a year
+    - **combined**: Any filters together narrow results
     """
-    books_to_return = BOOKS
-
-    # Apply rating filter if provided
-    if rating:
-        books_to_return = [book for book in books_to_return if book.rating == rating]
-
-    # Apply publish_date filter if provided
-    if publish_date:
-        books_to_return = [
-            book for book in books_to_return if book.published_date == publish_date
-        ]
-
-    return books_to_return
+    return book_store.search(
+        rating=rating,
+        rating_gte=rating_gte,
+        published_date=publish_date,
+        published_after=published_after,
+        published_before=published_before,
+    )
 
 
 # Update book
@@ -233,11 +262,9 @@ async def get_books_by_rating(
     description="Updates a book if exists",
 )
 async def update_books(book: BookRequest):
-    for i, item in enumerate(BOOKS):
-        if item.id == book.id:
-            updated_book = Books(**book.model_dump())
-            BOOKS[i] = updated_book
-            return updated_book
+    updated_book = Books(**book.model_dump())
+    if book_store.replace(updated_book):
+        return updated_book
 
     # If we reach here, book was not found
     raise HTTPException(
@@ -252,8 +279,7 @@ async def update_books(book: BookRequest):
     status_code=status.HTTP_200_OK,
 )
 async def delete_book(id: int):
-    for i, book in enumerate(BOOKS):
-        if book.id == id:
-            removed_item = BOOKS.pop(i)
-            return {"removed": removed_item}
+    removed_item = book_store.delete(id)
+    if removed_item is not None:
+        return {"removed": removed_item}
     raise HTTPException(status_code=404, detail=f"Book with id {id} not found")
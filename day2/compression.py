@@ -0,0 +1,166 @@
+"""
+Response compression middleware (gzip / brotli).
+
+- Picks the encoding from the request's Accept-Encoding header (br preferred over gzip)
+- Skips small bodies, streaming responses and already-encoded responses
+- Compresses large bodies on a worker thread so the event loop keeps serving requests
+- Caches compressed bytes by content hash, so an unchanged list payload is compressed once
+
+Usage:
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+# brotli is optional; without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+class CompressedCache:
+    """Small LRU of compressed bodies keyed by (encoding, body digest)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    Return "br", "gzip" or None (send the body as is) for an Accept-Encoding header value.
+    Codings the client refuses with q=0, directly or through "*;q=0", are never chosen.
+    """
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        qualities[coding.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    # br first so it wins ties: it compresses JSON noticeably better
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        q = qualities.get(coding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        offload_size: int = 64 * 1024,
+        cache_entries: int = 64,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = CompressedCache(cache_entries)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                or len(body) < self.minimum_size
+            ):
+                # Streaming (e.g. SSE) and small bodies go out untouched
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = await self.compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if len(body) >= self.offload_size:
+            compressed = await anyio.to_thread.run_sync(self._compress, body, encoding)
+        else:
+            compressed = self._compress(body, encoding)
+        self.cache.put(key, compressed)
+        return compressed
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
@@ -1,13 +1,42 @@
-from sqlalchemy import create_engine, engine
+from sqlalchemy import create_engine, engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+import os
 
 # 1. Define where database is
 SQLALCHEMY_DATABASE_URL = "sqlite:///./todosapp.db"
+
+# SQLite connection profile, applied to every new connection (see apply_sqlite_pragmas)
+# Set SQLITE_PROFILE=0 to keep SQLite's defaults
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "1") == "1"
+SQLITE_PRAGMAS = {
+    # WAL: readers don't block the writer and the writer doesn't block readers
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # NORMAL is durable against app crashes in WAL mode, fsyncs only at checkpoints
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Bytes of the file read through mmap instead of read() syscalls
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Page cache per connection; negative means KiB (here 64 MiB)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-64000")),
+    # Wait this long (ms) for a lock instead of failing with "database is locked"
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
 # 2. Create engine (connection manager)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+if SQLITE_PROFILE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
 # 3. Create session factory (for making "conversations" with DB)
 SessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=engine)
 # 4. Create base class (for defining tables)
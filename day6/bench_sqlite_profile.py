@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+SQLite Profile Benchmark
+Compares read and write throughput under concurrency with SQLite defaults vs the
+production profile from database.py (WAL, synchronous=NORMAL, mmap, cache, busy_timeout).
+
+Runs against a temporary copy of the todos schema, never against todosapp.db.
+
+Run from the day6 directory:
+  python bench_sqlite_profile.py
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from database import apply_sqlite_pragmas
+import models
+from models import Todos
+
+DURATION_SECONDS = 3
+WRITERS = 4
+READERS = 8
+SEED_ROWS = 5000
+
+
+def make_engine(path: str, profile: bool):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if profile:
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Todos),
+            [
+                {"title": f"todo {i}", "description": "seed", "priority": 1, "complete": False, "owner_id": i % 50}
+                for i in range(SEED_ROWS)
+            ],
+        )
+    return engine
+
+
+def run(engine) -> dict:
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + DURATION_SECONDS
+
+    def writer(n: int) -> None:
+        done = locked = 0
+        while time.perf_counter() < stop:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        insert(Todos).values(title="bench", description="w", priority=2, complete=False, owner_id=n)
+                    )
+                done += 1
+            except OperationalError:
+                locked += 1
+        with lock:
+            counts["writes"] += done
+            counts["locked"] += locked
+
+    def reader(n: int) -> None:
+        done = locked = 0
+        query = select(func.count()).select_from(Todos).where(Todos.owner_id == n % 50)
+        while time.perf_counter() < stop:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(query).scalar()
+                done += 1
+            except OperationalError:
+                locked += 1
+        with lock:
+            counts["reads"] += done
+            counts["locked"] += locked
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {key: value / DURATION_SECONDS if key != "locked" else value for key, value in counts.items()}
+
+
+def main() -> None:
+    print(f"{WRITERS} writer threads, {READERS} reader threads, {DURATION_SECONDS}s each\n")
+    print(f"{'profile':<10}{'writes/s':>12}{'reads/s':>12}{'locked errors':>15}")
+    for label, profile in (("default", False), ("tuned", True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(os.path.join(tmp, "bench.db"), profile)
+            result = run(engine)
+            engine.dispose()
+        print(f"{label:<10}{result['writes']:>12.0f}{result['reads']:>12.0f}{result['locked']:>15}")
+
+
+if __name__ == "__main__":
+    main()
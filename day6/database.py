@@ -1,14 +1,105 @@
-from sqlalchemy import create_engine, engine
+from sqlalchemy import create_engine, engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+import os
 
 # 1. Define where database is
 SQLALCHEMY_DATABASE_URL = "sqlite:///./todosapp.db"
+
+# SQLite connection profile, applied to every new connection (see apply_sqlite_pragmas)
+# Set SQLITE_PROFILE=0 to keep SQLite's defaults
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "1") == "1"
+SQLITE_PRAGMAS = {
+    # WAL: readers don't block the writer and the writer doesn't block readers
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # NORMAL is durable against app crashes in WAL mode, fsyncs only at checkpoints
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Bytes of the file read through mmap instead of read() syscalls
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Page cache per connection; negative means KiB (here 64 MiB)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-64000")),
+    # Wait this long (ms) for a lock instead of failing with "database is locked"
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def apply_sqlite_read_pragmas(dbapi_connection, connection_record):
+    # journal_mode can't be changed on a read-only connection (the writer already set WAL)
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        if name != "journal_mode":
+            cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+# Engine mode (SQLITE_ENGINE_MODE):
+#   - "default"       : one pooled engine for reads and writes
+#   - "single_writer" : reads use a pool of read-only connections, all writes go
+#                       through one writer connection fed by a queue (see sqlite_writer.py)
+SQLITE_ENGINE_MODE = os.getenv("SQLITE_ENGINE_MODE", "default")
+SQLITE_READER_POOL_SIZE = int(os.getenv("SQLITE_READER_POOL_SIZE", "8"))
+SQLITE_WRITER_BATCH_SIZE = int(os.getenv("SQLITE_WRITER_BATCH_SIZE", "64"))
+
 # 2. Create engine (connection manager)
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+if SQLITE_ENGINE_MODE == "single_writer":
+    # The only writable connection; also used for create_all
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+    )
+else:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    )
+if SQLITE_PROFILE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+
+read_engine = engine
+writer = None
+if SQLITE_ENGINE_MODE == "single_writer":
+    from sqlite_writer import SQLiteWriter
+
+    # Before any connection opens: the writer registers connect listeners of its own,
+    # and the pool keeps (and never re-initializes) the connection opened below
+    writer = SQLiteWriter(engine, max_batch=SQLITE_WRITER_BATCH_SIZE)
+    # Switch the file to WAL before read-only connections open it
+    with engine.connect():
+        pass
+    read_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL.replace("sqlite:///", "sqlite:///file:") + "?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        pool_size=SQLITE_READER_POOL_SIZE,
+        max_overflow=0,
+    )
+    if SQLITE_PROFILE:
+        event.listen(read_engine, "connect", apply_sqlite_read_pragmas)
+
 # 3. Create session factory (for making "conversations" with DB)
-SessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=engine)
+SessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=read_engine)
 # 4. Create base class (for defining tables)
 Base = declarative_base()
+
+
+async def run_write(db, write):
+    """
+    Run write(session) and commit it.
+
+    In single_writer mode the write runs on the writer thread (batched with other
+    writes); otherwise it runs on the request's own session, exactly as before.
+    Returns whatever write() returns.
+    """
+    if writer is not None:
+        return await writer.submit(write)
+    result = write(db)
+    db.commit()
+    return result
@@ -1,4 +1,4 @@
-from database import SessionLocal
+from database import SessionLocal, run_write
 from datetime import timedelta, datetime, timezone
 from typing import Annotated
 from sqlalchemy.orm import Session
@@ -118,8 +118,7 @@ async def create_user(db: db_dependency, create_user_request: CreateUserRequest)
         hashed_password=hashed_password,
         is_active=True,
     )
-    db.add(create_user_model)
-    db.commit()
+    await run_write(db, lambda session: session.add(create_user_model))
     return {f"{create_user_model.username}": "Created"}
 
 
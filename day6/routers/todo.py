@@ -12,7 +12,7 @@ import database
 
 import models
 from models import Todos
-from database import engine, SessionLocal
+from database import engine, SessionLocal, run_write
 from routers.auth import get_current_user
 
 
@@ -138,8 +138,7 @@ async def create_todo(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
     todo_model = Todos(**todo_request.model_dump(), owner_id=user.get("id"))
-    db.add(todo_model)
-    db.commit()
+    await run_write(db, lambda session: session.add(todo_model))
 
 
 @router.put("/{todo_id}", status_code=HTTP_204_NO_CONTENT)
@@ -151,30 +150,35 @@ async def update_todo(
 ):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
-    )
-    if todo_model is None:
-        raise HTTPException(status_code=404, detail=f"TODO item {todo_id} not found")
-    todo_model.title = todo_request.title
-    todo_model.complete = todo_request.complete
-    todo_model.priority = todo_request.priority
-    todo_model.description = todo_request.description
 
-    db.add(todo_model)
-    db.commit()
+    # Look up and modify in the session that commits (the writer's, in single_writer mode)
+    def write(session):
+        todo_model = (
+            session.query(Todos)
+            .filter(Todos.id == todo_id)
+            .filter(Todos.owner_id == user.get("id"))
+            .first()
+        )
+        if todo_model is None:
+            raise HTTPException(status_code=404, detail=f"TODO item {todo_id} not found")
+        todo_model.title = todo_request.title
+        todo_model.complete = todo_request.complete
+        todo_model.priority = todo_request.priority
+        todo_model.description = todo_request.description
+        session.add(todo_model)
+
+    await run_write(db, write)
 
 
 @router.delete("/{todo_id}", status_code=HTTP_204_NO_CONTENT)
 async def delete_todo(user: user_dependency,db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).filter(Todos.owner_id == user.get("id")).first()
-    if todo_model is None:
-        raise HTTPException(status_code=404, detail=f"TODO item {todo_id} not found")
 
-    db.delete(todo_model)
-    db.commit()
+    def write(session):
+        todo_model = session.query(Todos).filter(Todos.id == todo_id).filter(Todos.owner_id == user.get("id")).first()
+        if todo_model is None:
+            raise HTTPException(status_code=404, detail=f"TODO item {todo_id} not found")
+        session.delete(todo_model)
+
+    await run_write(db, write)
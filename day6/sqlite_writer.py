@@ -0,0 +1,96 @@
+"""
+Single-writer queue for SQLite.
+
+SQLite allows one writer at a time. Instead of letting every request race for the
+write lock, all writes are handed to one dedicated thread that owns the only
+writable connection. The thread drains whatever is queued, runs each write in its
+own SAVEPOINT and commits the whole batch once.
+
+A failing write only rolls back its own savepoint; its caller gets the exception,
+the rest of the batch still commits.
+"""
+
+import asyncio
+import queue
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+
+class SQLiteWriter:
+    def __init__(self, engine, max_batch: int = 64) -> None:
+        self.engine = engine
+        self.max_batch = max_batch
+        # expire_on_commit=False: returned objects are read after the writer's session is gone
+        self._session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # pysqlite starts transactions lazily and mishandles SAVEPOINT; take over
+        # BEGIN ourselves (IMMEDIATE: grab the write lock up front)
+        event.listen(engine, "connect", self._disable_pysqlite_transactions)
+        event.listen(engine, "begin", self._begin_immediate)
+
+    @staticmethod
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+
+    @staticmethod
+    def _begin_immediate(conn) -> None:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    async def submit(self, fn):
+        """Run fn(session) on the writer thread and return its result (or raise its error)."""
+        self._ensure_thread()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((fn, loop, future))
+        return await future
+
+    def _ensure_thread(self) -> None:
+        # Started lazily so a forked worker gets its own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for (_, loop, future), outcome in zip(batch, self._write_batch(batch)):
+                loop.call_soon_threadsafe(_resolve, future, outcome)
+
+    def _write_batch(self, batch: list) -> list:
+        outcomes = []
+        with self._session_factory() as session:
+            try:
+                for fn, _, _ in batch:
+                    try:
+                        with session.begin_nested():
+                            outcomes.append((True, fn(session)))
+                    except Exception as e:
+                        outcomes.append((False, e))
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                outcomes = [(False, e)] * len(batch)
+        return outcomes
+
+
+def _resolve(future, outcome) -> None:
+    if future.done():
+        return  # caller was cancelled
+    ok, value = outcome
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
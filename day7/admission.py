@@ -0,0 +1,190 @@
+"""
+Admission control: shed load early instead of queueing on the DB pool.
+
+When PostgreSQL slows down, requests pile up waiting for a pooled connection until
+pool_timeout, every worker stalls and the service falls over. This middleware turns
+requests away at the door with 503 + Retry-After while that is happening.
+
+Requests fall into priority classes by path:
+    user   /todo/...   adaptive in-flight limit, shed first
+    auth   /auth/...   own in-flight limit (bcrypt-heavy), shed once pool wait is 2x target
+    admin  /admin/...  own in-flight limit, shed last (4x target), so operators can act
+/healthz and /readyz are never shed; /todo/stream is admitted like user traffic but
+doesn't hold an in-flight slot while it streams (it holds no connection).
+
+The user limit adapts to the DB pool (database.pool_waits): while checkouts wait
+longer than ADMISSION_TARGET_POOL_WAIT_MS it shrinks by a quarter every
+ADJUST_INTERVAL; once waits are back under half the target it grows by one again,
+up to ADMISSION_MAX_INFLIGHT.
+
+Configuration (env variables):
+    ADMISSION_CONTROL               1 to enable (default 1), 0 to admit everything
+    ADMISSION_MAX_INFLIGHT          user requests in flight per worker (default 64)
+    ADMISSION_MIN_INFLIGHT          floor for the adaptive limit (default 4)
+    ADMISSION_AUTH_INFLIGHT         auth requests in flight (default 8)
+    ADMISSION_ADMIN_INFLIGHT        admin requests in flight (default 8)
+    ADMISSION_TARGET_POOL_WAIT_MS   acceptable pool checkout wait (default 100)
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+from database import pool_waits
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "64"))
+ADMISSION_MIN_INFLIGHT = int(os.getenv("ADMISSION_MIN_INFLIGHT", "4"))
+ADMISSION_AUTH_INFLIGHT = int(os.getenv("ADMISSION_AUTH_INFLIGHT", "8"))
+ADMISSION_ADMIN_INFLIGHT = int(os.getenv("ADMISSION_ADMIN_INFLIGHT", "8"))
+ADMISSION_TARGET_POOL_WAIT_MS = float(os.getenv("ADMISSION_TARGET_POOL_WAIT_MS", "100"))
+
+ADJUST_INTERVAL = 0.25
+NEVER_SHED = {"/healthz", "/readyz"}
+# Long-lived responses that don't keep a DB connection: admitted, but not counted in flight
+UNCOUNTED = {"/todo/stream"}
+
+
+class PriorityClass:
+    __slots__ = ("name", "limit", "max_limit", "pool_wait_factor", "adaptive", "in_flight", "admitted", "shed")
+
+    def __init__(self, name: str, limit: int, pool_wait_factor: float | None, adaptive: bool = False) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_limit = limit
+        # Shed the whole class once pool wait exceeds target * factor (None: never on pool wait)
+        self.pool_wait_factor = pool_wait_factor
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "limit": self.limit,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT,
+        min_inflight: int = ADMISSION_MIN_INFLIGHT,
+        auth_inflight: int = ADMISSION_AUTH_INFLIGHT,
+        admin_inflight: int = ADMISSION_ADMIN_INFLIGHT,
+        target_pool_wait_ms: float = ADMISSION_TARGET_POOL_WAIT_MS,
+        pool_wait=pool_waits,
+    ) -> None:
+        self.min_inflight = min_inflight
+        self.target = target_pool_wait_ms / 1000
+        self.pool_wait = pool_wait
+        self.classes = {
+            # user traffic is throttled by its adaptive limit, not cut off by the pool wait factor
+            "user": PriorityClass("user", max_inflight, None, adaptive=True),
+            "auth": PriorityClass("auth", auth_inflight, 2.0),
+            "admin": PriorityClass("admin", admin_inflight, 4.0),
+        }
+        # Handlers run on worker threads in HANDLER_MODE=sync
+        self._lock = threading.Lock()
+        self._next_adjust = 0.0
+
+    @staticmethod
+    def classify(path: str) -> str | None:
+        if path in NEVER_SHED:
+            return None
+        if path.startswith("/admin"):
+            return "admin"
+        if path.startswith("/auth"):
+            return "auth"
+        return "user"
+
+    def _adjust(self, wait: float, now: float) -> None:
+        user = self.classes["user"]
+        if wait > self.target:
+            user.limit = max(self.min_inflight, math.floor(user.limit * 0.75))
+        elif wait < self.target / 2 and user.limit < user.max_limit:
+            user.limit += 1
+        self._next_adjust = now + ADJUST_INTERVAL
+
+    def try_admit(self, class_name: str, counted: bool = True) -> bool:
+        wait = self.pool_wait.current_wait()
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_adjust:
+                self._adjust(wait, now)
+            priority = self.classes[class_name]
+            overloaded = priority.pool_wait_factor is not None and wait > self.target * priority.pool_wait_factor
+            if overloaded or (counted and priority.in_flight >= priority.limit):
+                priority.shed += 1
+                return False
+            if counted:
+                priority.in_flight += 1
+            priority.admitted += 1
+            return True
+
+    def release(self, class_name: str) -> None:
+        with self._lock:
+            self.classes[class_name].in_flight -= 1
+
+    def retry_after(self) -> int:
+        """Seconds for Retry-After: roughly how long the backlog takes to drain."""
+        return max(1, math.ceil(self.pool_wait.current_wait() * 2))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            classes = {name: c.snapshot() for name, c in self.classes.items()}
+        return {
+            "enabled": ADMISSION_CONTROL,
+            "target_pool_wait_ms": self.target * 1000,
+            "pool": self.pool_wait.snapshot(),
+            "classes": classes,
+        }
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController = admission_controller) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        class_name = self.controller.classify(path)
+        if class_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        counted = path not in UNCOUNTED
+        if not self.controller.try_admit(class_name, counted):
+            await self._reject(send, class_name)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if counted:
+                self.controller.release(class_name)
+
+    async def _reject(self, send, class_name: str) -> None:
+        body = json.dumps({"detail": "Server is overloaded, retry later", "class": class_name}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.controller.retry_after()).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Handler Mode Benchmark
+Compares HANDLER_MODE=async (blocking `async def` handlers on the event loop) with
+HANDLER_MODE=sync (plain `def` handlers on a threadpool sized to the DB pool).
+
+For each mode a uvicorn worker is started on a throwaway SQLite database (or on
+DATABASE_URL if set), one user gets SEED_TODOS todos, then CLIENTS concurrent clients
+call GET /todo/ for DURATION_SECONDS. The "+ logins" scenario turns LOGIN_CLIENTS
+of them into clients that log in repeatedly (bcrypt). Meanwhile a probe calls /readyz
+every PROBE_INTERVAL seconds: its latency shows how responsive the event loop stays,
+and its report gives the threadpool queue depth.
+
+Run from the day7 directory:
+  python bench_handler_modes.py
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PORT = 8765
+DURATION_SECONDS = 5
+CLIENTS = 32
+LOGIN_CLIENTS = 4
+SEED_TODOS = 200
+PROBE_INTERVAL = 0.05
+
+USER = {"username": "bench", "email": "bench@example.com", "first_name": "Bench",
+        "last_name": "User", "password": "password", "role": "user"}
+
+
+def start_server(mode: str, database_url: str) -> subprocess.Popen:
+    env = {**os.environ, "HANDLER_MODE": mode, "DATABASE_URL": database_url, "AUTO_CREATE_SCHEMA": "1"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/healthz")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+async def seed(client: httpx.AsyncClient) -> dict:
+    await client.post("/auth/", json=USER)  # 500s harmlessly if the user already exists
+    token = (await client.post("/auth/token", data={"username": USER["username"], "password": USER["password"]})).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    existing = len((await client.get("/todo/", headers=headers)).json())
+    for i in range(existing, SEED_TODOS):
+        todo = {"title": f"Bench todo {i}", "description": "benchmark data", "priority": i % 5 + 1, "complete": False}
+        await client.post("/todo/", json=todo, headers=headers)
+    return headers
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else float("nan")
+
+
+async def run_scenario(client: httpx.AsyncClient, headers: dict, login_clients: int) -> dict:
+    stop = time.perf_counter() + DURATION_SECONDS
+    latencies, errors = [], 0
+    probe_latencies, queued = [], []
+
+    async def reader() -> None:
+        nonlocal errors
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            response = await client.get("/todo/", headers=headers)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    async def login() -> None:
+        nonlocal errors
+        while time.perf_counter() < stop:
+            response = await client.post("/auth/token", data={"username": USER["username"], "password": USER["password"]})
+            errors += response.status_code != 200
+
+    async def probe() -> None:
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            report = (await client.get("/readyz")).json()
+            probe_latencies.append(time.perf_counter() - started)
+            queued.append(report["threadpool"]["queued"])
+            await asyncio.sleep(PROBE_INTERVAL)
+
+    tasks = [reader() for _ in range(CLIENTS - login_clients)] + [login() for _ in range(login_clients)]
+    await asyncio.gather(*tasks, probe())
+    return {
+        "rps": len(latencies) / DURATION_SECONDS,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "probe_p99": percentile(probe_latencies, 0.99),
+        "queued_max": max(queued, default=0),
+        "errors": errors,
+    }
+
+
+async def bench_mode(mode: str, database_url: str) -> list:
+    server = start_server(mode, database_url)
+    try:
+        limits = httpx.Limits(max_connections=CLIENTS + 1)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+            headers = await seed(client)
+            return [
+                ("reads", await run_scenario(client, headers, 0)),
+                ("reads + logins", await run_scenario(client, headers, LOGIN_CLIENTS)),
+            ]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    print(f"{CLIENTS} clients, {DURATION_SECONDS}s per scenario, {SEED_TODOS} todos per GET /todo/\n")
+    print(f"{'mode':<7}{'scenario':<16}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'readyz p99':>12}{'queued max':>12}{'errors':>8}")
+    for mode in ("async", "sync"):
+        # Fresh SQLite file per mode so both start from the same data
+        database_url = os.getenv("DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_modes.db')}"
+        for scenario, r in asyncio.run(bench_mode(mode, database_url)):
+            print(
+                f"{mode:<7}{scenario:<16}{r['rps']:>8.0f}{r['p50']:>9.1f}{r['p99']:>9.1f}"
+                f"{r['probe_p99']:>12.1f}{r['queued_max']:>12}{r['errors']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
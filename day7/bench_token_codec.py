@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Token Codec Benchmark
+Times encode/decode for each token backend. Runs test_token_codecs.py first and
+stops if the backends are not interchangeable.
+
+Run from the day7 directory:
+  python bench_token_codec.py
+"""
+
+import sys
+import timeit
+from datetime import timedelta
+
+import test_token_codecs
+from test_token_codecs import CLAIMS, SECRET_KEY
+from token_codec import TOKEN_CODECS, get_token_codec
+
+ITERATIONS = 20000
+
+
+def bench() -> None:
+    print(f"\n{'codec':<8}{'encode (µs)':>14}{'decode (µs)':>14}")
+    for name in TOKEN_CODECS:
+        codec = get_token_codec(SECRET_KEY, name)
+        lifetime = timedelta(minutes=20)
+        token = codec.encode(CLAIMS, lifetime)
+        enc = min(timeit.repeat(lambda: codec.encode(CLAIMS, lifetime), number=ITERATIONS, repeat=3))
+        dec = min(timeit.repeat(lambda: codec.decode(token), number=ITERATIONS, repeat=3))
+        print(f"{name:<8}{enc / ITERATIONS * 1e6:>14.2f}{dec / ITERATIONS * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    if test_token_codecs.main():
+        sys.exit(1)
+    bench()
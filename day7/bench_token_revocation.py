@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Token Revocation Benchmark
+Measures what the revocation check adds to get_current_user's hot path.
+
+Run from the day7 directory (no database needed, the list is filled in memory):
+  python bench_token_revocation.py
+"""
+
+import timeit
+import uuid
+from datetime import timedelta
+
+from token_codec import get_token_codec
+from token_revocation import RevocationList, issued_at_ms, now_ms
+
+SECRET_KEY = "9b2468f687b8e512948ff1811854779f9a5dd772635513c9df497e359bc1176b"
+ITERATIONS = 200000
+
+
+def main() -> None:
+    codec = get_token_codec(SECRET_KEY, "hs256")
+    # Same units as the app: iat in seconds with milliseconds, cutoffs in milliseconds
+    now = now_ms()
+    claims = {"sub": "regular_user", "id": 42, "role": "user", "jti": uuid.uuid4().hex, "iat": now / 1000}
+    token = codec.encode(claims, timedelta(minutes=20))
+    payload = codec.decode(token)
+
+    print(f"{'revoked entries':>16}{'check (µs)':>12}{'decode (µs)':>13}{'overhead':>10}")
+    decode = min(timeit.repeat(lambda: codec.decode(token), number=ITERATIONS // 10, repeat=3))
+    decode_us = decode / (ITERATIONS // 10) * 1e6
+    for size in (0, 1_000, 100_000, 1_000_000):
+        revocations = RevocationList()
+        revocations.revoked_jtis = {uuid.uuid4().hex for _ in range(size)}
+        revocations.user_not_before = {user_id: now for user_id in range(1000, 1000 + size // 10)}
+        # The token's user is revoked at the millisecond it was issued: only tokens from
+        # strictly before the cutoff are rejected, so it passes (one ms later it wouldn't)
+        revocations.user_not_before[payload["id"]] = issued_at_ms(payload)
+        assert not revocations.is_revoked(payload)
+        revocations.user_not_before[payload["id"]] += 1
+        assert revocations.is_revoked(payload)
+        revocations.user_not_before[payload["id"]] -= 1
+        check = min(timeit.repeat(lambda: revocations.is_revoked(payload), number=ITERATIONS, repeat=3))
+        check_us = check / ITERATIONS * 1e6
+        print(f"{size:>16,}{check_us:>12.3f}{decode_us:>13.2f}{check_us / decode_us:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Debug-mode detector for blocking calls made on the event loop.
+
+Every route is `async def` but calls synchronous SQLAlchemy and bcrypt, which
+freezes the whole worker while they run. With DEBUG_BLOCKING_CALLS=1 the app
+reports them in two ways:
+
+- SQL on the loop thread: a cursor-execute hook on the engine flags every
+  statement executed while an event loop is running in the current thread,
+  however fast it was (tiny test databases never make queries look slow).
+- Slow callbacks: a heartbeat is scheduled on the loop every few milliseconds.
+  A watchdog thread notices when it is late by more than BLOCKING_THRESHOLD_MS
+  and grabs the loop thread's stack while it is still blocked (bcrypt.checkpw,
+  time.sleep, a big json.dumps, ...).
+
+Each offender is logged once with the route and the stack, and kept in
+blocking_detector.offenders keyed by "<route> | <file>:<function> | sql|slow"
+(file and function of the innermost frame in this app's code). check_blocking_calls.py runs the routes and fails on
+offenders not listed in blocking_baseline.txt.
+
+Off by default: the hook and the watchdog are only installed when enabled.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from sqlalchemy import event
+
+DEBUG_BLOCKING_CALLS = os.getenv("DEBUG_BLOCKING_CALLS", "0") == "1"
+BLOCKING_THRESHOLD_MS = float(os.getenv("BLOCKING_THRESHOLD_MS", "20"))
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Middleware/instrumentation wrapping every request; left out of reported stacks
+WRAPPER_MODULES = {"blocking_detector.py", "tracing.py", "compression.py", "profiling.py"}
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class BlockingCallDetector:
+    def __init__(self, threshold_ms: float = BLOCKING_THRESHOLD_MS) -> None:
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 4
+        # key -> {"route", "site", "kind", "count", "max_ms", "stack"}
+        self.offenders: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._requests: dict = {}  # task -> ASGI scope of the request it serves
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_tick = 0.0
+        self._sampled = None  # (route, frames) captured by the watchdog for the current stall
+
+    # ---------- wiring ----------
+
+    def instrument_engine(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+
+    def middleware(self, app):
+        """ASGI middleware factory: app.add_middleware(detector.middleware)."""
+        detector = self
+
+        async def blocking_call_middleware(scope, receive, send):
+            if scope["type"] != "http":
+                await app(scope, receive, send)
+                return
+            detector._ensure_started()
+            task = asyncio.current_task()
+            detector._requests[task] = scope
+            try:
+                await app(scope, receive, send)
+            finally:
+                detector._requests.pop(task, None)
+
+        return blocking_call_middleware
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # First request, or a new loop (forked worker, test client): restart on this loop
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.perf_counter()
+        loop.call_soon(self._tick)
+        threading.Thread(target=self._watch, args=(loop,), name="blocking-watchdog", daemon=True).start()
+
+    # ---------- slow callbacks ----------
+
+    def _tick(self) -> None:
+        now = time.perf_counter()
+        late = now - self._last_tick - self.interval
+        self._last_tick = now
+        sampled, self._sampled = self._sampled, None
+        if late > self.threshold:
+            route, frames = sampled if sampled else ("<unknown>", [])
+            self._record("slow", route, frames, late * 1000)
+        if not self._loop.is_closed():
+            self._loop.call_later(self.interval, self._tick)
+
+    def _watch(self, loop) -> None:
+        while self._loop is loop and not loop.is_closed():
+            time.sleep(self.interval)
+            if self._sampled is None and time.perf_counter() - self._last_tick - self.interval > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._sampled = (self._route(asyncio.current_task(loop)), traceback.extract_stack(frame))
+
+    # ---------- SQL on the loop thread ----------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # worker thread or plain script: not blocking a loop
+        self._record("sql", self._route(asyncio.current_task()), traceback.extract_stack()[:-1], None)
+
+    # ---------- reporting ----------
+
+    def _route(self, task) -> str:
+        scope = self._requests.get(task)
+        if scope is None:
+            return "<no request>"
+        route = scope.get("route")
+        return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+    def _record(self, kind: str, route: str, frames: list, blocked_ms: float | None) -> None:
+        app_frames = [
+            f for f in frames
+            if f.filename.startswith(APP_DIR) and os.path.relpath(f.filename, APP_DIR) not in WRAPPER_MODULES
+        ]
+        if app_frames:
+            innermost = app_frames[-1]
+            site = f"{os.path.relpath(innermost.filename, APP_DIR)}:{innermost.name}"
+        else:
+            site = "<outside app code>"
+        key = f"{route} | {site} | {kind}"
+        with self._lock:
+            offender = self.offenders.get(key)
+            if offender is None:
+                offender = self.offenders[key] = {
+                    "route": route,
+                    "site": site,
+                    "kind": kind,
+                    "count": 0,
+                    "max_ms": None,
+                    "stack": "".join(traceback.format_list(app_frames or frames[-8:])),
+                }
+                new = True
+            else:
+                new = False
+            offender["count"] += 1
+            if blocked_ms is not None:
+                offender["max_ms"] = round(max(offender["max_ms"] or 0.0, blocked_ms), 1)
+        if new:
+            what = "ran SQL on the event loop" if kind == "sql" else f"blocked the event loop for {blocked_ms:.0f} ms"
+            logger.warning("Blocking call: %s %s at %s\n%s", route, what, site, offender["stack"])
+
+
+blocking_detector = BlockingCallDetector()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Fails when a route blocks the event loop in a way not already listed in blocking_baseline.txt.
+
+Runs the app in-process against a throwaway SQLite database with the blocking-call
+detector enabled (see blocking_detector.py), calls every route once, then compares
+the offenders with the baseline:
+  - new offender      -> printed with its stack, exit code 1
+  - fixed offender    -> printed, remove it with --update-baseline
+
+Usage (from the day7 directory):
+  python check_blocking_calls.py
+  python check_blocking_calls.py --update-baseline   # accept the current offenders
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blocking_baseline.txt")
+
+
+def exercise_routes(client) -> None:
+    def register(username: str, role: str) -> dict:
+        client.post("/auth/", json={
+            "username": username, "email": f"{username}@example.com", "first_name": "Check",
+            "last_name": "User", "password": "password", "role": role,
+        })
+        token = client.post("/auth/token", data={"username": username, "password": "password"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    admin = register("check_admin", "admin")
+    user = register("check_user", "user")
+
+    todo = {"title": "Blocking check", "description": "created by check_blocking_calls", "priority": 3, "complete": False}
+    client.post("/todo/", json=todo, headers=user)
+    todo_id = client.get("/todo/", headers=user).json()[0]["id"]
+    client.get(f"/todo/{todo_id}", headers=user)
+    client.put(f"/todo/{todo_id}", json={**todo, "complete": True}, headers=user)
+    client.get("/todo/changes", params={"since": 0}, headers=user)
+    client.delete(f"/todo/{todo_id}", headers=user)
+
+    client.get("/admin/todo", headers=admin)
+    client.get("/admin/metrics/compression", headers=admin)
+    client.get("/admin/metrics/write-batcher", headers=admin)
+    client.post("/admin/revoke/token", json={"jti": "0" * 32}, headers=admin)
+    client.get("/healthz")
+    client.get("/readyz")
+    client.post("/auth/logout", headers=user)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(), "blocking_check.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    os.environ["AUTO_CREATE_SCHEMA"] = "1"
+    os.environ["DEBUG_BLOCKING_CALLS"] = "1"
+    # Well above a query on a small SQLite file, well below one bcrypt round trip,
+    # so timing noise on a busy machine doesn't produce offenders
+    os.environ.setdefault("BLOCKING_THRESHOLD_MS", "100")
+
+    from fastapi.testclient import TestClient
+    from blocking_detector import blocking_detector
+    from main import app
+
+    with TestClient(app) as client:
+        exercise_routes(client)
+
+    found = blocking_detector.offenders
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            f.write("# Known blocking calls on the event loop, one per line: <route> | <file>:<function> | <kind>\n")
+            f.write("# Regenerate with: python check_blocking_calls.py --update-baseline\n")
+            f.writelines(f"{key}\n" for key in sorted(found))
+        print(f"Wrote {len(found)} offenders to {BASELINE_FILE}")
+        return 0
+
+    baseline = set()
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = {line.strip() for line in f if line.strip() and not line.startswith("#")}
+
+    new = sorted(set(found) - baseline)
+    fixed = sorted(baseline - set(found))
+    for key in new:
+        offender = found[key]
+        blocked = f"  (blocked {offender['max_ms']} ms)" if offender["max_ms"] is not None else ""
+        print(f"NEW  {key}{blocked}\n{offender['stack']}")
+    for key in fixed:
+        print(f"FIXED  {key}  (no longer blocks, run with --update-baseline)")
+    print(f"{len(found)} offenders, {len(new)} new, {len(fixed)} fixed")
+    return 1 if new else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Request deadlines enforced on the database.
+
+Every request gets a deadline: REQUEST_DEADLINE_MS by default, a per-route budget
+where the route declares one (dependencies=[Depends(route_deadline(ms))]), and
+shorter if the client asks for it with an X-Request-Timeout header (milliseconds;
+a client can shorten the server's budget, never extend it).
+
+The deadline is handed to the connection the request checks out:
+- PostgreSQL: each transaction starts with SET LOCAL statement_timeout = <time left>,
+  so a runaway query is cancelled by the server itself. SET LOCAL ends with the
+  transaction, the connection goes back to the pool with its normal settings.
+- SQLite: a progress handler interrupts the running statement once time is up.
+Statements are not started at all once the deadline has passed.
+
+Either way the request fails with DeadlineExceeded, which main.py turns into a 504.
+After that, cleanup statements (rollback, releasing an idempotency key) still get
+DEADLINE_CLEANUP_GRACE_MS each, so the request can tidy up.
+"""
+
+import contextvars
+import os
+import sqlite3
+import time
+
+from sqlalchemy import event
+
+REQUEST_DEADLINE_MS = int(os.getenv("REQUEST_DEADLINE_MS", "10000"))
+DEADLINE_CLEANUP_GRACE_MS = int(os.getenv("DEADLINE_CLEANUP_GRACE_MS", "1000"))
+DEADLINE_HEADER = b"x-request-timeout"
+# statement_timeout is re-sent when the time left drops this far below the value last set
+RESET_SLACK_MS = 100
+# SQLite progress handler runs every N virtual machine instructions
+SQLITE_PROGRESS_INSTRUCTIONS = 10_000
+POSTGRES_QUERY_CANCELED = "57014"
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    __slots__ = ("started", "client_ms", "expires_at", "exceeded")
+
+    def __init__(self, budget_ms: int, client_ms: int | None) -> None:
+        self.started = time.monotonic()
+        self.client_ms = client_ms
+        self.exceeded = False
+        self.set_budget(budget_ms)
+
+    def set_budget(self, budget_ms: int) -> None:
+        if self.client_ms is not None:
+            budget_ms = min(budget_ms, self.client_ms)
+        self.expires_at = self.started + budget_ms / 1000
+
+    def remaining_ms(self) -> int:
+        return int((self.expires_at - time.monotonic()) * 1000)
+
+
+def _client_timeout_ms(value: str | None) -> int | None:
+    try:
+        ms = int(value)
+    except (TypeError, ValueError):
+        return None
+    return ms if ms > 0 else None
+
+
+class DeadlineMiddleware:
+    def __init__(self, app, default_ms: int = REQUEST_DEADLINE_MS) -> None:
+        self.app = app
+        self.default_ms = default_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client_ms = None
+        for name, value in scope["headers"]:
+            if name == DEADLINE_HEADER:
+                client_ms = _client_timeout_ms(value.decode("latin-1"))
+                break
+        token = _current_deadline.set(Deadline(self.default_ms, client_ms))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_deadline.reset(token)
+
+
+def route_deadline(budget_ms: int):
+    """Route dependency replacing the default budget: dependencies=[Depends(route_deadline(30000))]."""
+
+    async def apply_route_deadline() -> None:
+        deadline = _current_deadline.get()
+        if deadline is not None:
+            deadline.set_budget(budget_ms)
+
+    return apply_route_deadline
+
+
+def _timeout_for_next_statement(deadline: Deadline) -> int:
+    """Milliseconds the next statement may run; raises once the deadline has passed."""
+    remaining = deadline.remaining_ms()
+    if remaining > 0:
+        return remaining
+    if not deadline.exceeded:
+        deadline.exceeded = True
+        raise DeadlineExceeded()
+    return DEADLINE_CLEANUP_GRACE_MS
+
+
+def instrument_engine(engine) -> None:
+    """Apply the current request's deadline to every transaction and statement on engine."""
+    if engine.dialect.name == "postgresql":
+        _instrument_postgres(engine)
+    elif engine.dialect.name == "sqlite":
+        _instrument_sqlite(engine)
+
+    @event.listens_for(engine, "handle_error")
+    def _translate_cancel(exception_context):
+        deadline = _current_deadline.get()
+        if deadline is None or deadline.remaining_ms() > 0:
+            return  # not ours: someone else's timeout or a plain error
+        original = exception_context.original_exception
+        cancelled = getattr(original, "pgcode", None) == POSTGRES_QUERY_CANCELED or (
+            isinstance(original, sqlite3.OperationalError) and "interrupted" in str(original)
+        )
+        if cancelled:
+            deadline.exceeded = True
+            raise DeadlineExceeded() from original
+
+
+def _set_statement_timeout(cursor, conn, timeout_ms: int) -> None:
+    cursor.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+    conn.info["statement_timeout_ms"] = timeout_ms
+
+
+def _instrument_postgres(engine) -> None:
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.info.pop("statement_timeout_ms", None)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        deadline = _current_deadline.get()
+        if deadline is None:
+            return
+        timeout_ms = _timeout_for_next_statement(deadline)
+        if not conn.in_transaction():
+            return  # autocommit: SET LOCAL would not outlive this statement
+        # First statement of the transaction, or the budget has shrunk noticeably since:
+        # (re)send the timeout on the same cursor, ahead of the real statement
+        applied = conn.info.get("statement_timeout_ms")
+        if applied is None or timeout_ms < applied - RESET_SLACK_MS or deadline.exceeded:
+            _set_statement_timeout(cursor, conn, timeout_ms)
+
+
+def _instrument_sqlite(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        deadline = _current_deadline.get()
+        if deadline is None:
+            return
+        stop_at = time.monotonic() + _timeout_for_next_statement(deadline) / 1000
+        # Returning True from the handler interrupts the statement ("interrupted")
+        conn.connection.dbapi_connection.set_progress_handler(
+            lambda: time.monotonic() > stop_at, SQLITE_PROGRESS_INSTRUCTIONS
+        )
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        # The connection goes back to the pool without this request's deadline
+        dbapi_connection.set_progress_handler(None, 0)
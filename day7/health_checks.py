@@ -0,0 +1,174 @@
+"""
+Worker saturation signals for the readiness check (routers/health.py).
+
+- pool_status: checked-out / overflow connections of database.engine's pool
+- loop_lag_monitor: how late the event loop runs a timer it scheduled, i.e. how long
+  callbacks on this worker are currently blocking the loop
+- bcrypt_work: password hashes / checks in flight on this worker, and the share of
+  recent wall time spent inside them
+- threadpool_stats: calls queued for a worker thread (threadpool.py)
+
+Which bcrypt threshold applies depends on HANDLER_MODE (threadpool.py). In sync mode
+bcrypt runs on threadpool threads, calls overlap, and the pending count says how many
+threads are tied up hashing. In async mode it runs on the event loop one call at a
+time, so pending never goes above 1; what saturates there is the loop itself, and the
+share of recent time spent in bcrypt says how much of the loop logins are taking.
+
+Thresholds (env variables), past which /readyz answers 503:
+    READY_MAX_POOL_UTILIZATION  checked-out connections / (pool_size + max_overflow), default 0.9
+    READY_MAX_LOOP_LAG_MS       worst loop lag over the last few seconds, default 250
+    READY_MAX_BCRYPT_PENDING    bcrypt calls in flight, default 4 (HANDLER_MODE=sync)
+    READY_MAX_BCRYPT_LOOP_SHARE share of the last READY_BCRYPT_WINDOW_SECONDS (default 10)
+                                spent in bcrypt, default 0.5 (HANDLER_MODE=async)
+    READY_MAX_THREADPOOL_QUEUE  calls waiting for a worker thread, default 50
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from threadpool import HANDLER_MODE, threadpool_stats
+
+READY_MAX_POOL_UTILIZATION = float(os.getenv("READY_MAX_POOL_UTILIZATION", "0.9"))
+READY_MAX_LOOP_LAG_MS = float(os.getenv("READY_MAX_LOOP_LAG_MS", "250"))
+READY_MAX_BCRYPT_PENDING = int(os.getenv("READY_MAX_BCRYPT_PENDING", "4"))
+READY_MAX_BCRYPT_LOOP_SHARE = float(os.getenv("READY_MAX_BCRYPT_LOOP_SHARE", "0.5"))
+READY_BCRYPT_WINDOW_SECONDS = float(os.getenv("READY_BCRYPT_WINDOW_SECONDS", "10"))
+READY_MAX_THREADPOOL_QUEUE = int(os.getenv("READY_MAX_THREADPOOL_QUEUE", "50"))
+
+
+def pool_status(engine) -> dict:
+    """Connection counts for engine's pool; capacity is None for pools without a limit."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"pool": type(pool).__name__, "checked_out": None, "capacity": None}
+    size = pool.size() if hasattr(pool, "size") else 0
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    # overflow() starts at -pool_size and counts up as connections are opened
+    overflow = max(0, pool.overflow()) if hasattr(pool, "overflow") else 0
+    capacity = size + max_overflow if max_overflow >= 0 else None
+    return {
+        "pool": type(pool).__name__,
+        "size": size,
+        "max_overflow": max_overflow,
+        "checked_out": pool.checkedout(),
+        "overflow": overflow,
+        "capacity": capacity,
+    }
+
+
+class LoopLagMonitor:
+    """
+    Sleeps interval seconds in a loop and records how late it wakes up.
+
+    A blocked loop shows up as lag on the next wake-up. Started on the running
+    loop by the first start() call (one monitor per worker process).
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 50) -> None:
+        self.interval = interval
+        self.samples: deque = deque(maxlen=window)
+        self._task = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - expected))
+
+    def snapshot(self) -> dict:
+        samples = list(self.samples)
+        return {
+            "current_ms": round(samples[-1] * 1000, 2) if samples else None,
+            "max_ms": round(max(samples) * 1000, 2) if samples else None,
+            "window_seconds": round(len(samples) * self.interval, 1),
+        }
+
+
+class BcryptWork:
+    """
+    Counts bcrypt calls in flight (they may run on the loop or on threadpool threads)
+    and remembers when recent calls finished and how long they took.
+    """
+
+    def __init__(self, window: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.recent: deque = deque(maxlen=window)
+
+    @contextmanager
+    def track(self):
+        with self._lock:
+            self.pending += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.recent.append((finished, finished - started))
+
+    def snapshot(self, window_seconds: float = READY_BCRYPT_WINDOW_SECONDS) -> dict:
+        since = time.monotonic() - window_seconds
+        with self._lock:
+            busy = sum(duration for finished, duration in self.recent if finished >= since)
+            return {
+                "pending": self.pending,
+                "completed": self.completed,
+                # Seconds of bcrypt per second of wall time; on the loop that's its share
+                "time_share": round(busy / window_seconds, 3),
+            }
+
+
+loop_lag_monitor = LoopLagMonitor()
+bcrypt_work = BcryptWork()
+
+
+def readiness(engine) -> tuple[bool, dict]:
+    """Collect all signals; returns (ready, report). Must run on the event loop."""
+    pool = pool_status(engine)
+    loop_lag = loop_lag_monitor.snapshot()
+    bcrypt = bcrypt_work.snapshot()
+    threadpool = threadpool_stats()
+
+    failing = []
+    if pool["capacity"]:
+        pool["utilization"] = round(pool["checked_out"] / pool["capacity"], 3)
+        if pool["utilization"] >= READY_MAX_POOL_UTILIZATION:
+            failing.append("db_pool")
+    if loop_lag["max_ms"] is not None and loop_lag["max_ms"] > READY_MAX_LOOP_LAG_MS:
+        failing.append("event_loop_lag")
+    if HANDLER_MODE == "sync":
+        if bcrypt["pending"] > READY_MAX_BCRYPT_PENDING:
+            failing.append("bcrypt")
+    elif bcrypt["time_share"] > READY_MAX_BCRYPT_LOOP_SHARE:
+        failing.append("bcrypt")
+    if threadpool["queued"] > READY_MAX_THREADPOOL_QUEUE:
+        failing.append("threadpool")
+
+    report = {
+        "status": "not ready" if failing else "ready",
+        "failing": failing,
+        "db_pool": pool,
+        "event_loop_lag": loop_lag,
+        "bcrypt": bcrypt,
+        "threadpool": threadpool,
+        "thresholds": {
+            "pool_utilization": READY_MAX_POOL_UTILIZATION,
+            "loop_lag_ms": READY_MAX_LOOP_LAG_MS,
+            "bcrypt_pending": READY_MAX_BCRYPT_PENDING if HANDLER_MODE == "sync" else None,
+            "bcrypt_loop_share": READY_MAX_BCRYPT_LOOP_SHARE if HANDLER_MODE == "async" else None,
+            "threadpool_queued": READY_MAX_THREADPOOL_QUEUE,
+        },
+    }
+    return not failing, report
@@ -0,0 +1,132 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+A client sends the same Idempotency-Key header on every retry of one logical request.
+The first request claims the key, runs normally and stores its response. Retries with
+the same key replay the stored response without running the handler again, so no
+duplicate rows are inserted and no password is hashed twice.
+
+Keys live in the idempotency_keys table, so every worker process sees them.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import IdempotencyKeys
+
+# How long a completed response is replayed for
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+# How long an in-progress claim blocks retries (covers a crashed worker)
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+# Expired rows are purged on every Nth claim made by this process
+PURGE_EVERY = 100
+# Request fields never fed into the stored fingerprint
+SECRET_FIELDS = frozenset({"password"})
+
+_claims = 0
+
+
+def request_hash(payload) -> str:
+    """
+    Fingerprint of a request body, to tell a retry from a different request reusing its key.
+    SECRET_FIELDS are left out: an unsalted SHA-256 of a password kept in the table for an
+    hour could be brute-forced far faster than its bcrypt hash. A retry that only changes
+    the password therefore replays the first response, as for any other retry.
+    """
+    body = jsonable_encoder(payload)
+    if isinstance(body, dict):
+        body = {name: value for name, value in body.items() if name not in SECRET_FIELDS}
+    encoded = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def check_idempotency(db: Session, scope: str, key: str | None, payload):
+    """
+    Returns the stored response for a retried request, or None if the handler should run.
+    When None is returned for a new key, the key is claimed and the caller must later call
+    save_idempotent_response() (on success) or release_idempotency_key() (on failure).
+    """
+    global _claims
+    if not key:
+        return None
+    row_key = f"{scope}:{key}"
+    fingerprint = request_hash(payload)
+    now = int(time.time())
+
+    row = db.get(IdempotencyKeys, row_key)
+    if row is not None and row.expires_at <= now:
+        db.delete(row)
+        db.commit()
+        row = None
+
+    if row is not None:
+        if row.request_hash != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="Idempotency-Key was already used with a different request body",
+            )
+        if row.status_code is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress",
+            )
+        return JSONResponse(
+            status_code=row.status_code,
+            content=json.loads(row.response_body),
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    _claims += 1
+    if _claims % PURGE_EVERY == 0:
+        db.query(IdempotencyKeys).filter(IdempotencyKeys.expires_at <= now).delete()
+
+    db.add(
+        IdempotencyKeys(
+            key=row_key,
+            request_hash=fingerprint,
+            expires_at=now + IDEMPOTENCY_LOCK_SECONDS,
+        )
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker claimed the same key between our read and insert
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress",
+        )
+    return None
+
+
+def save_idempotent_response(db: Session, scope: str, key: str | None, status_code: int, body) -> None:
+    if not key:
+        return
+    db.query(IdempotencyKeys).filter(IdempotencyKeys.key == f"{scope}:{key}").update(
+        {
+            "status_code": status_code,
+            "response_body": json.dumps(jsonable_encoder(body)),
+            "expires_at": int(time.time()) + IDEMPOTENCY_TTL_SECONDS,
+        }
+    )
+    db.commit()
+
+
+def release_idempotency_key(db: Session, scope: str, key: str | None) -> None:
+    """Drop an in-progress claim after a failure, so the client's retry can run."""
+    if not key:
+        return
+    db.rollback()
+    db.query(IdempotencyKeys).filter(
+        IdempotencyKeys.key == f"{scope}:{key}",
+        IdempotencyKeys.status_code.is_(None),
+    ).delete()
+    db.commit()
@@ -1,8 +1,58 @@
-from fastapi import FastAPI
-from routers import auth, todo,admin
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+from routers import auth, todo,admin, health
+from compression import CompressionMiddleware
+from profiling import ProfilingMiddleware
+from tracing import TracingMiddleware, instrument_engine
+from blocking_detector import DEBUG_BLOCKING_CALLS, blocking_detector
+from threadpool import configure_threadpool
+from deadlines import DeadlineExceeded, DeadlineMiddleware
+from admission import ADMISSION_CONTROL, AdmissionMiddleware
+import deadlines
+import database
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema comes from Alembic migrations unless AUTO_CREATE_SCHEMA=1 (see database.py)
+    database.check_schema(database.engine)
+    # Per worker: match the threadpool to the DB pool (see threadpool.py)
+    configure_threadpool(database.engine)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+# Last added runs first: admission control, then tracing, compression, the profiler
+# and the deadline, then the app
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+app.add_middleware(TracingMiddleware)
+# Outermost, so shed requests cost as little as possible (see admission.py)
+if ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware)
+instrument_engine(database.engine)
+# Per-request deadlines become statement timeouts on the request's connection
+deadlines.instrument_engine(database.engine)
+
+# Debug only: report sync DB / bcrypt calls blocking the event loop (see blocking_detector.py)
+if DEBUG_BLOCKING_CALLS:
+    app.add_middleware(blocking_detector.middleware)
+    blocking_detector.instrument_engine(database.engine)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    # The query was cancelled (or never started); the session's rollback returns the connection clean
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Request deadline exceeded"},
+    )
 
-app = FastAPI()
 
 app.include_router(auth.router)
 app.include_router(todo.router)
 app.include_router(admin.router)
+app.include_router(health.router)
@@ -0,0 +1,87 @@
+"""
+Helpers for schema changes on a live database.
+
+- create_index_concurrently / drop_index_concurrently: on PostgreSQL the index is
+  built with CONCURRENTLY outside the migration transaction, so writes to the
+  table are not blocked while it builds. Other databases get a normal index.
+- backfill_in_batches: fills a new column a few thousand rows at a time, each
+  batch in its own short transaction, pausing between batches so the backfill
+  doesn't starve regular traffic.
+"""
+
+import time
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: list[str], unique: bool = False) -> None:
+    if not _is_postgres():
+        op.create_index(index_name, table_name, columns, unique=unique, if_not_exists=True)
+        return
+    with op.get_context().autocommit_block():
+        # A failed CONCURRENTLY build leaves an INVALID index behind; drop it and retry
+        # (can't be checked when only generating SQL with --sql)
+        invalid = None if context.is_offline_mode() else op.get_bind().execute(
+            sa.text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": index_name},
+        ).first()
+        if invalid is not None:
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+        op.create_index(
+            index_name,
+            table_name,
+            columns,
+            unique=unique,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    if not _is_postgres():
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill_in_batches(
+    table_name: str,
+    set_clause: str,
+    where_clause: str,
+    batch_size: int = 5000,
+    pause_seconds: float = 0.1,
+) -> int:
+    """
+    Run UPDATE <table> SET <set_clause> WHERE <where_clause> in batches of batch_size rows.
+
+    where_clause must stop matching a row once it has been updated
+    (e.g. "version IS NULL"), otherwise the loop never ends.
+    Returns the number of rows updated.
+    """
+    statement = sa.text(
+        f"UPDATE {table_name} SET {set_clause} "
+        f"WHERE id IN (SELECT id FROM {table_name} WHERE {where_clause} LIMIT :batch_size)"
+    )
+    if context.is_offline_mode():
+        # --sql output: rowcounts are unknown, emit one unbatched UPDATE for the DBA to run
+        op.execute(f"UPDATE {table_name} SET {set_clause} WHERE {where_clause}")
+        return 0
+    total = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            # autocommit: every batch commits on its own and releases its row locks
+            updated = bind.execute(statement, {"batch_size": batch_size}).rowcount
+            total += updated
+            if updated < batch_size:
+                return total
+            time.sleep(pause_seconds)
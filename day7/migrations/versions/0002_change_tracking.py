@@ -0,0 +1,84 @@
+"""Change tracking, idempotency keys and token revocation
+
+Adds todos.version (backfilled in batches) with its (owner_id, version) index built
+concurrently, plus the todo_tombstones, change_counters, idempotency_keys and
+revoked_tokens tables. Safe to run while the app is serving traffic.
+
+Revision ID: 0002_change_tracking
+Revises: 0001_initial
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import (
+    backfill_in_batches,
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+
+revision: str = "0002_change_tracking"
+down_revision: Union[str, None] = "0001_initial"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("owner_id", sa.Integer()),
+        sa.Column("version", sa.Integer()),
+    )
+    op.create_index("ix_todo_tombstones_owner_version", "todo_tombstones", ["owner_id", "version"])
+    op.create_table(
+        "change_counters",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.Integer()),
+    )
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("request_hash", sa.String()),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("response_body", sa.String(), nullable=True),
+        sa.Column("expires_at", sa.Integer()),
+    )
+    op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"])
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("jti", sa.String(), unique=True, nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("not_before", sa.Integer(), nullable=True),
+        sa.Column("expires_at", sa.Integer()),
+    )
+    op.create_index("ix_revoked_tokens_id", "revoked_tokens", ["id"])
+    op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+
+    # Nullable column without a default: a metadata-only change, no table rewrite
+    op.add_column("todos", sa.Column("version", sa.Integer(), nullable=True))
+    # Existing rows get version = id, then the counter continues from there
+    backfill_in_batches("todos", "version = id", "version IS NULL")
+    op.execute(
+        "INSERT INTO change_counters (name, value) "
+        "SELECT 'todos', COALESCE(MAX(version), 0) FROM todos"
+    )
+    create_index_concurrently("ix_todos_owner_version", "todos", ["owner_id", "version"])
+
+
+def downgrade() -> None:
+    drop_index_concurrently("ix_todos_owner_version", "todos")
+    with op.batch_alter_table("todos") as batch_op:
+        batch_op.drop_column("version")
+    op.drop_index("ix_revoked_tokens_expires_at", table_name="revoked_tokens")
+    op.drop_index("ix_revoked_tokens_id", table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
+    op.drop_table("change_counters")
+    op.drop_index("ix_todo_tombstones_owner_version", table_name="todo_tombstones")
+    op.drop_table("todo_tombstones")
@@ -0,0 +1,40 @@
+"""Millisecond cutoffs for per-user token revocation
+
+Adds revoked_tokens.not_before_ms. Tokens now carry iat in milliseconds, and a
+user revocation rejects tokens issued strictly before the cutoff, so a token from
+a re-login in the same second as the revoke stays valid. Existing rows revoked
+every token issued up to the end of their not_before second, and are backfilled
+to exactly that.
+
+The old not_before column is left in place (nullable, no longer read) so
+instances still running the previous release can keep writing it.
+
+Revision ID: 0003_revocation_ms_cutoff
+Revises: 0002_change_tracking
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003_revocation_ms_cutoff"
+down_revision: Union[str, None] = "0002_change_tracking"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable column without a default: a metadata-only change, no table rewrite
+    op.add_column("revoked_tokens", sa.Column("not_before_ms", sa.BigInteger(), nullable=True))
+    # Only unexpired revocations live in this table, so one UPDATE is small
+    op.execute(
+        "UPDATE revoked_tokens SET not_before_ms = (not_before + 1) * 1000 "
+        "WHERE not_before IS NOT NULL AND not_before_ms IS NULL"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("revoked_tokens") as batch_op:
+        batch_op.drop_column("not_before_ms")
@@ -1,6 +1,6 @@
 import string
 from database import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, ForeignKey, Index
 
 
 class Users(Base):
@@ -23,3 +23,54 @@ class Todos(Base):
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Change version, bumped on every create/update (see todo_changes.py)
+    version = Column(Integer, default=0)
+
+    __table_args__ = (Index("ix_todos_owner_version", "owner_id", "version"),)
+
+
+class TodoTombstones(Base):
+    """One row per deleted todo, so delta sync can report deletions."""
+
+    __tablename__ = "todo_tombstones"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer)
+    version = Column(Integer)
+
+    __table_args__ = (Index("ix_todo_tombstones_owner_version", "owner_id", "version"),)
+
+
+class ChangeCounters(Base):
+    """Monotonic counters handed out as change versions (one row per stream, e.g. "todos:<owner_id>")."""
+
+    __tablename__ = "change_counters"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, default=0)
+
+
+class IdempotencyKeys(Base):
+    __tablename__ = "idempotency_keys"
+    # "<scope>:<Idempotency-Key header>", scope is e.g. "todo:<owner_id>" or "auth"
+    key = Column(String, primary_key=True)
+    request_hash = Column(String)
+    # NULL while the original request is still in progress
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(String, nullable=True)
+    expires_at = Column(Integer, index=True)
+
+
+class RevokedTokens(Base):
+    """
+    Revocation entries, kept until the tokens they cover have expired.
+    Either jti is set (one token, e.g. logout) or user_id + not_before_ms
+    (every token of that user issued before not_before_ms, in epoch milliseconds).
+    """
+
+    __tablename__ = "revoked_tokens"
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, nullable=True)
+    user_id = Column(Integer, nullable=True)
+    # Superseded by not_before_ms (migration 0003); still written for the previous release
+    not_before = Column(Integer, nullable=True)
+    not_before_ms = Column(BigInteger, nullable=True)
+    expires_at = Column(Integer, index=True)
@@ -0,0 +1,151 @@
+"""
+On-demand profiling of single requests, for admins only.
+
+Send an admin token plus the X-Profile header:
+    X-Profile: 1       run the request under cProfile, save the report, return the normal
+                       response with an X-Profile-Report header naming the saved files
+    X-Profile: inline  return the text report instead of the normal response body
+Any other value (0, off, true, ...) is ignored and the request runs unprofiled.
+
+Reports are written to PROFILE_DIR as <id>.prof (load with pstats or snakeviz) and
+<id>.txt (summary for get_db, get_current_user, SQLAlchemy, bcrypt and serialization,
+followed by the top functions by cumulative time).
+
+Without the header the middleware does one header lookup and nothing else. Requests
+from non-admins carrying the header run normally, unprofiled.
+
+cProfile follows the event-loop thread, so other requests interleaving on the same
+worker while the profiled one awaits show up in the report too.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from routers.auth import token_codec
+from token_revocation import revocation_list
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_MODES = ("1", "inline")
+
+# Label -> predicate on a pstats key (filename, line, function name)
+SUMMARY_GROUPS = {
+    "get_db": lambda key: key[2] == "get_db",
+    "get_current_user": lambda key: key[2] == "get_current_user",
+    "bcrypt": lambda key: key[2] in ("hashpw", "checkpw", "gensalt"),
+    "serialization": lambda key: key[2] in ("jsonable_encoder", "serialize_response"),
+}
+
+
+def is_admin_request(headers: Headers) -> bool:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = token_codec.decode(token)
+    except Exception:
+        return False
+    return payload.get("role") == "admin" and not revocation_list.is_revoked(payload)
+
+
+def summarize(stats: pstats.Stats) -> dict:
+    summary = {}
+    for label, matches in SUMMARY_GROUPS.items():
+        # cumulative time of the outermost matching entries (max avoids double counting recursion)
+        summary[label] = max((v[3] for k, v in stats.stats.items() if matches(k)), default=0.0)
+    # SQLAlchemy: own time of every function in the package, ORM + Core + driver glue
+    summary["sqlalchemy"] = sum(
+        v[2] for k, v in stats.stats.items() if f"{os.sep}sqlalchemy{os.sep}" in k[0]
+    )
+    return summary
+
+
+def render_report(profiler: cProfile.Profile, method: str, path: str, wall_seconds: float) -> str:
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    out.write(f"{method} {path}  wall={wall_seconds * 1000:.2f} ms\n\n")
+    for label, seconds in summarize(stats).items():
+        out.write(f"  {label:<18}{seconds * 1000:>10.2f} ms\n")
+    out.write("\n")
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, profile_dir: str = PROFILE_DIR) -> None:
+        self.app = app
+        self.profile_dir = profile_dir
+        # cProfile can't run two profilers at once; one profiled request per worker
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        mode = headers.get("x-profile")
+        if mode not in PROFILE_MODES or self._busy or not is_admin_request(headers):
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        try:
+            if mode == "inline":
+                await self._profile_inline(scope, receive, send)
+            else:
+                await self._profile_to_file(scope, receive, send)
+        finally:
+            self._busy = False
+
+    async def _run_profiled(self, scope, receive, send) -> tuple[cProfile.Profile, str]:
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+        wall = time.perf_counter() - started
+        return profiler, render_report(profiler, scope["method"], scope["path"], wall)
+
+    async def _profile_to_file(self, scope, receive, send) -> None:
+        report_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Report"] = report_id
+            await send(message)
+
+        profiler, report = await self._run_profiled(scope, receive, send_wrapper)
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.profile_dir, f"{report_id}.prof"))
+        with open(os.path.join(self.profile_dir, f"{report_id}.txt"), "w") as f:
+            f.write(report)
+
+    async def _profile_inline(self, scope, receive, send) -> None:
+        status_code = 200
+
+        async def discard(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        _, report = await self._run_profiled(scope, receive, discard)
+        body = f"response status: {status_code}\n{report}".encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -1,5 +1,6 @@
+import time
 from typing import Annotated
-from fastapi import APIRouter, Depends, Path, status, HTTPException
+from fastapi import APIRouter, Body, Depends, Path, status, HTTPException
 from sqlalchemy.orm import Session
 from starlette.status import HTTP_204_NO_CONTENT
 
@@ -7,36 +8,119 @@ import database
 
 import models
 from models import Todos
-from database import engine, SessionLocal
-from routers.auth import get_current_user
+from database import engine, SessionLocal, session_stats
+from routers.auth import get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from token_revocation import revocation_list
+from compression import compression_stats
+from routers.todo import todo_batcher
+from todo_events import todo_events
+from todo_changes import record_todo_tombstone
+from tracing import TracedRoute, trace_span
+from threadpool import sync_handler, threadpool_stats
+from deadlines import route_deadline
+from admission import admission_controller
+from health_checks import pool_status
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=TracedRoute)
 
-models.Base.metadata.create_all(bind=database.engine)
+if database.AUTO_CREATE_SCHEMA:
+    models.Base.metadata.create_all(bind=database.engine)
 
 def get_db():
-    db = SessionLocal()
+    with trace_span("get_db"):
+        db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        with trace_span("get_db.close"):
+            session_stats.record_close(db)
+            db.close()
 
 
 db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
-@router.get("/todo",status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency,db: db_dependency):
+# Keep 'user' before 'db' in route signatures so authentication resolves first
+
+# The full table scan gets a longer budget than regular requests (see deadlines.py)
+ADMIN_READ_ALL_DEADLINE_MS = 15000
+
+
+@router.get("/todo",status_code=status.HTTP_200_OK, dependencies=[Depends(route_deadline(ADMIN_READ_ALL_DEADLINE_MS))])
+@sync_handler
+def read_all(user: user_dependency,db: db_dependency):
     if user is None or user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="Authentication Failed")
     return db.query(Todos).all()
 
 @router.delete("/{todo_id}", status_code=HTTP_204_NO_CONTENT)
-async def delete_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
+@sync_handler
+def delete_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None or user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
     todo_model = db.query(Todos).filter(Todos.id == todo_id).first()
     if todo_model is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"TODO item {todo_id} not found")
     db.delete(todo_model)
-    db.commit()
\ No newline at end of file
+    record_todo_tombstone(db, todo_id, todo_model.owner_id)
+    todo_events.publish(db, todo_model.owner_id, "delete", todo_id)
+    db.commit()
+
+
+@router.get("/metrics/compression", status_code=status.HTTP_200_OK)
+async def compression_metrics(user: user_dependency):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
+    return compression_stats.snapshot()
+
+
+@router.get("/metrics/write-batcher", status_code=status.HTTP_200_OK)
+async def write_batcher_metrics(user: user_dependency):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
+    if todo_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **todo_batcher.snapshot()}
+
+
+@router.get("/metrics/threadpool", status_code=status.HTTP_200_OK)
+async def threadpool_metrics(user: user_dependency):
+    """Handler mode, worker threads in use and calls queued for one (see threadpool.py)."""
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
+    return {**threadpool_stats(), "db_pool": pool_status(engine)}
+
+
+@router.get("/metrics/sessions", status_code=status.HTTP_200_OK)
+async def session_metrics(user: user_dependency):
+    """Request sessions that used a DB connection vs. closed without one (see database.py)."""
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
+    return session_stats.snapshot()
+
+
+@router.get("/metrics/admission", status_code=status.HTTP_200_OK)
+async def admission_metrics(user: user_dependency):
+    """Per priority class: in-flight requests, current limit, admitted and shed counts."""
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
+    return admission_controller.snapshot()
+
+
+@router.post("/revoke/user/{user_id}", status_code=HTTP_204_NO_CONTENT)
+@sync_handler
+def revoke_user_tokens(user: user_dependency, db: db_dependency, user_id: int = Path(gt=0)):
+    """Revoke every token issued to a user so far (they must log in again)."""
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
+    revocation_list.revoke_user(db, user_id, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+@router.post("/revoke/token", status_code=HTTP_204_NO_CONTENT)
+@sync_handler
+def revoke_token(user: user_dependency, db: db_dependency, jti: str = Body(embed=True)):
+    """Revoke a single token by its jti claim."""
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication failed")
+    # The token's own exp is unknown here, keep the entry for the longest possible lifetime
+    revocation_list.revoke_token(db, jti, int(time.time()) + ACCESS_TOKEN_EXPIRE_MINUTES * 60)
@@ -1,16 +1,27 @@
-from database import SessionLocal
+from database import SessionLocal, session_stats
+import uuid
 from datetime import timedelta, datetime, timezone
 from typing import Annotated
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from pydantic import BaseModel
 from sqlalchemy.engine import create
 from models import Users
 import bcrypt
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from jose import jwt, JWTError
-
-router = APIRouter(prefix="/auth", tags=["auth"])
+from token_codec import TokenError, get_token_codec
+from token_revocation import now_ms, revocation_list
+from tracing import TracedRoute, trace_span
+from threadpool import sync_handler
+from deadlines import DeadlineExceeded
+from health_checks import bcrypt_work
+from idempotency import (
+    check_idempotency,
+    save_idempotent_response,
+    release_idempotency_key,
+)
+
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TracedRoute)
 
 # openssl rand -hex 32
 SECRET_KEY = "9b2468f687b8e512948ff1811854779f9a5dd772635513c9df497e359bc1176b"
@@ -18,30 +29,43 @@ ALGORITHM = "HS256"
 
 # Bcrypt configuration
 BCRYPT_ROUNDS = 12
+ACCESS_TOKEN_EXPIRE_MINUTES = 20
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+# Token encode/decode backend, chosen with the TOKEN_CODEC env variable (see token_codec.py)
+token_codec = get_token_codec(SECRET_KEY)
+
 
 def get_db():
     """
     Database dependency that creates a new database session for each request.
     Yields the session and automatically closes it when the request is complete.
     """
-    db = SessionLocal()
+    with trace_span("get_db"):
+        db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        with trace_span("get_db.close"):
+            session_stats.record_close(db)
+            db.close()
 
 
 def create_access_token(username: str, user_id: int, role: str ,expires_delta: timedelta):
     """
     Creates a JWT access token with user information and expiration time.
     Token contains username, user_id, and expires in UTC timezone.
+    jti (unique token id) and iat (issued at) make the token revocable.
     """
-    encode = {"sub": username, "id": user_id, "role": role}
-    expires = datetime.now(timezone.utc) + expires_delta
-    encode.update({"exp": expires})
-    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+    encode = {
+        "sub": username,
+        "id": user_id,
+        "role": role,
+        "jti": uuid.uuid4().hex,
+        # Milliseconds, so a per-user revoke can tell tokens from the same second apart
+        "iat": now_ms() / 1000,
+    }
+    return token_codec.encode(encode, expires_delta)
 
 
 def authenticate_user(username: str, password: str, db: Session):
@@ -57,7 +81,9 @@ def authenticate_user(username: str, password: str, db: Session):
         # Both password and hash need to be bytes
         password_bytes = password.encode('utf-8')
         hash_bytes = user.hashed_password.encode('utf-8')
-        if not bcrypt.checkpw(password_bytes, hash_bytes):
+        with trace_span("bcrypt.checkpw"), bcrypt_work.track():
+            password_ok = bcrypt.checkpw(password_bytes, hash_bytes)
+        if not password_ok:
             return False
         # Ensure user attributes are loaded (access them to trigger lazy loading if needed)
         _ = user.id, user.username
@@ -98,33 +124,52 @@ class CreateUserRequest(BaseModel):
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_user(db: db_dependency, create_user_request: CreateUserRequest):
+@sync_handler
+def create_user(
+    db: db_dependency,
+    create_user_request: CreateUserRequest,
+    idempotency_key: Annotated[str | None, Header()] = None,
+):
     """
     Register a new user account.
     Hashes the password using bcrypt before storing in database.
+    A retry with the same Idempotency-Key header replays the first response
+    without hashing the password or inserting the user again.
     """
-    # Hash password using bcrypt
-    hashed_password = bcrypt.hashpw(
-        create_user_request.password.encode('utf-8'),
-        bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
-    ).decode('utf-8')
-    
-    create_user_model = Users(
-        email=create_user_request.email,
-        username=create_user_request.username,
-        first_name=create_user_request.first_name,
-        last_name=create_user_request.last_name,
-        role=create_user_request.role,
-        hashed_password=hashed_password,
-        is_active=True,
-    )
-    db.add(create_user_model)
-    db.commit()
-    return {f"{create_user_model.username}": "Created"}
+    replay = check_idempotency(db, "auth", idempotency_key, create_user_request)
+    if replay is not None:
+        return replay
+
+    try:
+        # Hash password using bcrypt
+        with trace_span("bcrypt.hashpw", **{"bcrypt.rounds": BCRYPT_ROUNDS}), bcrypt_work.track():
+            hashed_password = bcrypt.hashpw(
+                create_user_request.password.encode('utf-8'),
+                bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+            ).decode('utf-8')
+
+        create_user_model = Users(
+            email=create_user_request.email,
+            username=create_user_request.username,
+            first_name=create_user_request.first_name,
+            last_name=create_user_request.last_name,
+            role=create_user_request.role,
+            hashed_password=hashed_password,
+            is_active=True,
+        )
+        db.add(create_user_model)
+        db.commit()
+    except Exception:
+        release_idempotency_key(db, "auth", idempotency_key)
+        raise
+    response = {f"{create_user_model.username}": "Created"}
+    save_idempotent_response(db, "auth", idempotency_key, status.HTTP_201_CREATED, response)
+    return response
 
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(
+@sync_handler
+def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency
 ):
     """
@@ -142,9 +187,9 @@ async def login_for_access_token(
         username = user.username
         user_id = user.id
         role = user.role
-        token = create_access_token(username, user_id, role, timedelta(minutes=20))
+        token = create_access_token(username, user_id, role, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
         return {"access_token": token, "token_type": "bearer"}
-    except HTTPException:
+    except (HTTPException, DeadlineExceeded):
         raise
     except Exception as e:
         # Log the actual error for debugging
@@ -162,18 +207,47 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
     """
     Dependency that extracts and validates JWT token from Authorization header.
     Returns user information (username, id) if token is valid, raises 401 otherwise.
+    Revoked tokens are rejected using the in-memory revocation list (no DB round-trip).
+    """
+    with trace_span("get_current_user"):
+        try:
+            payload = token_codec.decode(token)
+            await revocation_list.maybe_refresh()
+            if revocation_list.is_revoked(payload):
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+            username: str = payload.get("sub")
+            user_id: int = payload.get("id")
+            user_role: str = payload.get("role")
+            if username is None or user_id is None:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+            return {
+                "username": username,
+                "id": user_id,
+                "user_role": user_role,
+                "jti": payload.get("jti"),
+                "exp": payload.get("exp"),
+            }
+        except (TokenError, HTTPException, AttributeError, TypeError):
+            # Bad/expired/revoked token or malformed claims. DeadlineExceeded, cancellation
+            # and revocation-list load failures propagate to their own handlers.
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate the user"
+
+            )
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+@sync_handler
+def logout(
+    user: Annotated[dict, Depends(get_current_user)], db: db_dependency
+):
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        user_id: int = payload.get("id")
-        user_role: str = payload.get("role")
-        if username is None or user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-        return {"username": username, "id": user_id, "user_role": user_role}
-    except:
+    Revoke the access token used for this request.
+    """
+    if user.get("jti") is None:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate the user"
-
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token has no jti and cannot be revoked, it expires on its own",
         )
+    revocation_list.revoke_token(db, user["jti"], user["exp"])
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+import database
+from health_checks import loop_lag_monitor, readiness
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/healthz", status_code=status.HTTP_200_OK)
+async def healthz():
+    """Liveness: the process is up and its event loop answers. Never touches the database."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", status_code=status.HTTP_200_OK)
+async def readyz():
+    """
+    Readiness: 503 while this worker is saturated (DB pool nearly exhausted, event loop
+    lagging, or bcrypt work piling up), so the load balancer routes around it.
+    Thresholds are configured in health_checks.py. No connection is checked out for the check.
+    """
+    # The lag monitor starts with the first probe; lag is reported from then on
+    loop_lag_monitor.start()
+    ready, report = readiness(database.engine)
+    return JSONResponse(
+        report,
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
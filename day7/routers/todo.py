@@ -1,9 +1,12 @@
+import asyncio
+import json
 from dataclasses import field
 from typing import Annotated, Type
-from fastapi import APIRouter, Depends, Path
+from fastapi import APIRouter, Depends, Header, Path, Query
 
 
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from starlette.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_204_NO_CONTENT
@@ -11,15 +14,50 @@ from starlette.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_204_NO_CONTENT
 import database
 
 import models
-from models import Todos
-from database import engine, SessionLocal
+from models import Todos, TodoTombstones
+from database import engine, SessionLocal, session_stats
 from routers.auth import get_current_user
-
-
-router = APIRouter(prefix="/todo", tags=["todo"])
-
-
-models.Base.metadata.create_all(bind=database.engine)
+from idempotency import (
+    check_idempotency,
+    save_idempotent_response,
+    release_idempotency_key,
+)
+from todo_events import todo_events
+from tracing import TracedRoute, trace_span
+from threadpool import sync_handler
+from deadlines import route_deadline
+from todo_changes import (
+    assign_todo_versions,
+    current_todo_version,
+    next_todo_version,
+    record_todo_tombstone,
+)
+from write_batcher import (
+    WriteBatcher,
+    TODO_WRITE_BATCHING,
+    TODO_BATCH_MAX_SIZE,
+    TODO_BATCH_MAX_DELAY_MS,
+)
+
+
+router = APIRouter(prefix="/todo", tags=["todo"], route_class=TracedRoute)
+
+
+if database.AUTO_CREATE_SCHEMA:
+    models.Base.metadata.create_all(bind=database.engine)
+
+# Optional group-commit batcher for create_todo (see write_batcher.py)
+todo_batcher = (
+    WriteBatcher(
+        engine,
+        Todos,
+        TODO_BATCH_MAX_SIZE,
+        TODO_BATCH_MAX_DELAY_MS,
+        before_insert=assign_todo_versions,
+    )
+    if TODO_WRITE_BATCHING
+    else None
+)
 
 
 # ==================== DEPENDENCY INJECTION FUNCTIONS ====================
@@ -33,12 +71,12 @@ def get_db():
     FastAPI calls this function via Depends(get_db) to provide database sessions to endpoints.
 
     Flow:
-        1. Create new session
+        1. Create new session (no connection is checked out until the first query)
         2. Yield (pause) and give session to endpoint
         3. Endpoint uses session
         4. Endpoint returns
         5. Resume here and run 'finally' block
-        6. Close session (cleanup)
+        6. Close session (cleanup, counted in database.session_stats)
 
     Why use 'yield' instead of 'return'?
         - 'return' can't guarantee cleanup if endpoint crashes
@@ -48,16 +86,22 @@ def get_db():
     Yields:
         Session: A database session for querying/modifying the database
     """
-    db = SessionLocal()
+    with trace_span("get_db"):
+        db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        with trace_span("get_db.close"):
+            session_stats.record_close(db)
+            db.close()
 
 
 db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
+# NOTE: every route lists 'user' before 'db'. FastAPI resolves dependencies in
+# parameter order, so get_current_user runs (and can raise 401) before get_db.
+
 
 class TodoRequest(BaseModel):
     title: str = Field(min_length=3)
@@ -66,8 +110,13 @@ class TodoRequest(BaseModel):
     complete: bool
 
 
-@router.get("/", status_code=HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+# Budget for listing every todo of a user (see deadlines.py)
+READ_ALL_DEADLINE_MS = 5000
+
+
+@router.get("/", status_code=HTTP_200_OK, dependencies=[Depends(route_deadline(READ_ALL_DEADLINE_MS))])
+@sync_handler
+def read_all(user: user_dependency, db: db_dependency):
     """
     Get all todos from the database.
 
@@ -112,8 +161,96 @@ async def read_all(user: user_dependency, db: db_dependency):
     return db.query(Todos).filter(Todos.owner_id == user.get("id")).all()
 
 
+# Seconds between keepalive comments, so proxies don't close idle streams
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/stream", status_code=HTTP_200_OK)
+async def stream_changes(user: user_dependency):
+    """
+    Server-Sent Events feed of the caller's todo changes.
+
+    Each event looks like:
+        event: update
+        data: {"type": "update", "id": 7, "owner_id": 3}
+
+    A "resync" event means events were dropped because the client fell behind;
+    the client should reload GET /todo/ once.
+
+    Registered before /{todo_id} so "stream" is not parsed as a todo id.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    subscriber = await todo_events.subscribe(user.get("id"))
+
+    async def event_stream():
+        try:
+            # Sent immediately so the client (and any middleware) gets the headers
+            yield ": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscriber.overflowed:
+                    subscriber.overflowed = False
+                    yield "event: resync\ndata: {}\n\n"
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            todo_events.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/changes", status_code=HTTP_200_OK)
+@sync_handler
+def read_changes(
+    user: user_dependency, db: db_dependency, since: int = Query(default=0, ge=0)
+):
+    """
+    Delta sync: todos created/updated and ids deleted after version `since`.
+
+    Clients store the returned "version" and pass it as `since` next time.
+    Apply upserts and deletes in version order (an id can appear in both if it was reused).
+    Both queries use the (owner_id, version) indexes, so the cost follows the number of
+    changes, not the size of the list.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    # Read the watermark BEFORE the rows: anything newer may be returned again next
+    # time (harmless upsert), but nothing at or below it can be missed
+    watermark = current_todo_version(db, user.get("id"))
+    upserts = (
+        db.query(Todos)
+        .filter(Todos.owner_id == user.get("id"))
+        .filter(Todos.version > since)
+        .order_by(Todos.version)
+        .all()
+    )
+    deletes = (
+        db.query(TodoTombstones.id, TodoTombstones.version)
+        .filter(TodoTombstones.owner_id == user.get("id"))
+        .filter(TodoTombstones.version > since)
+        .order_by(TodoTombstones.version)
+        .all()
+    )
+    return {
+        "version": max(watermark, since),
+        "upserts": upserts,
+        "deletes": [{"id": row.id, "version": row.version} for row in deletes],
+    }
+
+
 @router.get("/{todo_id}", status_code=HTTP_200_OK)
-async def read_todo(
+@sync_handler
+def read_todo(
     user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)
 ):
     if user is None:
@@ -130,20 +267,75 @@ async def read_todo(
     raise HTTPException(status_code=404, detail=f"TODO item {todo_id} not found")
 
 
-@router.post("/", status_code=HTTP_201_CREATED)
-async def create_todo(
-    user: user_dependency, db: db_dependency, todo_request: TodoRequest
+@sync_handler
+def create_todo(
+    user: user_dependency,
+    db: db_dependency,
+    todo_request: TodoRequest,
+    idempotency_key: Annotated[str | None, Header()] = None,
 ):
 
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
-    todo_model = Todos(**todo_request.model_dump(), owner_id=user.get("id"))
-    db.add(todo_model)
-    db.commit()
+    # Retries carrying the same Idempotency-Key replay the first response
+    scope = f"todo:{user.get('id')}"
+    replay = check_idempotency(db, scope, idempotency_key, todo_request)
+    if replay is not None:
+        return replay
+
+    try:
+        todo_model = Todos(
+            **todo_request.model_dump(),
+            owner_id=user.get("id"),
+            version=next_todo_version(db, user.get("id")),
+        )
+        db.add(todo_model)
+        # flush() assigns the id so the change event can carry it
+        db.flush()
+        todo_events.publish(db, user.get("id"), "create", todo_model.id)
+        db.commit()
+    except Exception:
+        release_idempotency_key(db, scope, idempotency_key)
+        raise
+    save_idempotent_response(db, scope, idempotency_key, HTTP_201_CREATED, None)
+
+
+# TODO_WRITE_BATCHING=1: the insert goes through the write batcher, which has to be
+# awaited, so this variant is always async (the batcher runs the INSERT on its own thread)
+async def create_todo_batched(
+    user: user_dependency,
+    db: db_dependency,
+    todo_request: TodoRequest,
+    idempotency_key: Annotated[str | None, Header()] = None,
+):
+
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    scope = f"todo:{user.get('id')}"
+    replay = check_idempotency(db, scope, idempotency_key, todo_request)
+    if replay is not None:
+        return replay
+
+    try:
+        todo_id = await todo_batcher.submit(
+            {**todo_request.model_dump(), "owner_id": user.get("id")}
+        )
+        todo_events.publish(db, user.get("id"), "create", todo_id)
+        db.commit()
+    except Exception:
+        release_idempotency_key(db, scope, idempotency_key)
+        raise
+    save_idempotent_response(db, scope, idempotency_key, HTTP_201_CREATED, None)
+
+
+router.post("/", status_code=HTTP_201_CREATED)(
+    create_todo_batched if todo_batcher is not None else create_todo
+)
 
 
 @router.put("/{todo_id}", status_code=HTTP_204_NO_CONTENT)
-async def update_todo(
+@sync_handler
+def update_todo(
     user: user_dependency,
     db: db_dependency,
     todo_request: TodoRequest,
@@ -163,13 +355,16 @@ async def update_todo(
     todo_model.complete = todo_request.complete
     todo_model.priority = todo_request.priority
     todo_model.description = todo_request.description
+    todo_model.version = next_todo_version(db, user.get("id"))
 
     db.add(todo_model)
+    todo_events.publish(db, user.get("id"), "update", todo_id)
     db.commit()
 
 
 @router.delete("/{todo_id}", status_code=HTTP_204_NO_CONTENT)
-async def delete_todo(user: user_dependency,db: db_dependency, todo_id: int = Path(gt=0)):
+@sync_handler
+def delete_todo(user: user_dependency,db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
     todo_model = db.query(Todos).filter(Todos.id == todo_id).filter(Todos.owner_id == user.get("id")).first()
@@ -177,5 +372,7 @@ async def delete_todo(user: user_dependency,db: db_dependency, todo_id: int = Pa
         raise HTTPException(status_code=404, detail=f"TODO item {todo_id} not found")
 
     db.query(Todos).filter(Todos.id == todo_id).filter(Todos.owner_id == user.get("id")).delete()
+    record_todo_tombstone(db, todo_id, user.get("id"))
+    todo_events.publish(db, user.get("id"), "delete", todo_id)
     db.commit()
     
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for users and todos.
+
+Fills the database configured by DATABASE_URL with production-scale data:
+  - every user gets the same precomputed bcrypt hash (one hash for the whole run)
+  - todo ownership is skewed (Zipf-like): a few heavy owners, a long tail of light ones
+  - rows are bulk-loaded with COPY on PostgreSQL and executemany on SQLite
+
+Run from the day7 directory against a migrated database (alembic upgrade head):
+  python seed_data.py --users 100000 --todos 5000000
+  python seed_data.py --users 1000 --todos 100000 --skew 1.2 --seed 7
+
+All seeded users can log in with the password given by --password (default: "password").
+"""
+
+import argparse
+import csv
+import io
+import random
+import time
+
+import bcrypt
+from sqlalchemy import text
+
+from database import engine
+from routers.auth import BCRYPT_ROUNDS
+
+CHUNK_ROWS = 100_000
+
+USER_COLUMNS = ("id", "email", "username", "first_name", "last_name", "hashed_password", "is_active", "role")
+TODO_COLUMNS = ("id", "title", "description", "priority", "complete", "owner_id", "version")
+PRIORITIES = (1, 2, 3, 4, 5)
+COMPLETE = (True, False)
+
+
+def owner_weights(user_count: int, skew: float) -> list[float]:
+    """Cumulative Zipf weights: owner of rank r gets weight 1 / r**skew."""
+    cumulative, total = [], 0.0
+    for rank in range(1, user_count + 1):
+        total += 1.0 / rank**skew
+        cumulative.append(total)
+    return cumulative
+
+
+def generate_users(first_id: int, count: int, hashed_password: str, admin_every: int):
+    for user_id in range(first_id, first_id + count):
+        role = "admin" if admin_every and user_id % admin_every == 0 else "user"
+        yield (user_id, f"user{user_id}@example.com", f"user{user_id}", "Seed", f"User{user_id}",
+               hashed_password, True, role)
+
+
+def generate_todos(
+    first_id: int, first_version: int, count: int, owner_ids: list[int], cum_weights: list[float], rng: random.Random
+):
+    todo_id, version = first_id, first_version
+    remaining = count
+    while remaining:
+        size = min(CHUNK_ROWS, remaining)
+        # Draw whole chunks at once, per-row randint() calls dominate otherwise
+        owners = rng.choices(owner_ids, cum_weights=cum_weights, k=size)
+        priorities = rng.choices(PRIORITIES, k=size)
+        completes = rng.choices(COMPLETE, weights=(3, 7), k=size)
+        for owner_id, priority, complete in zip(owners, priorities, completes):
+            yield (todo_id, f"Todo {todo_id}", "Generated todo", priority, complete, owner_id, version)
+            todo_id += 1
+            version += 1
+        remaining -= size
+
+
+def chunks(rows, size: int = CHUNK_ROWS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_postgres(raw_conn, table: str, columns: tuple, rows) -> int:
+    loaded = 0
+    with raw_conn.cursor() as cursor:
+        for chunk in chunks(rows):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(chunk)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            loaded += len(chunk)
+    raw_conn.commit()
+    return loaded
+
+
+def load_sqlite(raw_conn, table: str, columns: tuple, rows) -> int:
+    loaded = 0
+    placeholders = ", ".join("?" for _ in columns)
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    cursor = raw_conn.cursor()
+    # One big transaction; the journal still protects the file if the load is interrupted
+    for chunk in chunks(rows):
+        cursor.executemany(statement, chunk)
+        loaded += len(chunk)
+    raw_conn.commit()
+    cursor.close()
+    return loaded
+
+
+def next_id(table: str) -> int:
+    with engine.connect() as conn:
+        return (conn.execute(text(f"SELECT MAX(id) FROM {table}")).scalar() or 0) + 1
+
+
+def next_version() -> int:
+    """First version above every change counter, so seeded rows sort after anything a client has seen."""
+    with engine.connect() as conn:
+        return (conn.execute(text("SELECT MAX(value) FROM change_counters")).scalar() or 0) + 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed users and todos")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--todos", type=int, default=1_000_000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent, higher = more skewed")
+    parser.add_argument("--admin-every", type=int, default=1000, help="every Nth user is an admin (0 = none)")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for repeatable datasets")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    is_postgres = engine.dialect.name == "postgresql"
+    load = load_postgres if is_postgres else load_sqlite
+
+    started = time.perf_counter()
+    hashed_password = bcrypt.hashpw(args.password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+    print(f"Precomputed password hash in {time.perf_counter() - started:.2f}s")
+
+    first_user_id, first_todo_id = next_id("users"), next_id("todos")
+    first_version = next_version()
+    owner_ids = list(range(first_user_id, first_user_id + args.users))
+    # Shuffle the rank -> user mapping so heavy owners aren't simply the lowest ids
+    rng.shuffle(owner_ids)
+    cum_weights = owner_weights(args.users, args.skew)
+
+    raw_conn = engine.raw_connection()
+    try:
+        for table, columns, rows in (
+            ("users", USER_COLUMNS, generate_users(first_user_id, args.users, hashed_password, args.admin_every)),
+            ("todos", TODO_COLUMNS, generate_todos(first_todo_id, first_version, args.todos, owner_ids, cum_weights, rng)),
+        ):
+            started = time.perf_counter()
+            loaded = load(raw_conn, table, columns, rows)
+            elapsed = time.perf_counter() - started
+            print(f"Loaded {loaded:,} {table} in {elapsed:.1f}s ({loaded / elapsed:,.0f} rows/s)")
+    finally:
+        raw_conn.close()
+
+    # Explicit ids bypassed the id sequences and the change counter; move them past the new rows
+    with engine.begin() as conn:
+        if is_postgres:
+            for table in ("users", "todos"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+        # Move each seeded owner's counter up to the last version they were given
+        conn.execute(
+            text(
+                "INSERT INTO change_counters (name, value) "
+                "SELECT 'todos:' || owner_id, MAX(version) FROM todos WHERE id >= :first GROUP BY owner_id "
+                "ON CONFLICT (name) DO UPDATE SET value = excluded.value WHERE change_counters.value < excluded.value"
+            ),
+            {"first": first_todo_id},
+        )
+
+    heaviest = cum_weights[0] / cum_weights[-1]
+    print(f"Heaviest owner (user {owner_ids[0]}) holds about {heaviest:.1%} of todos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Production runner for the day7 app.
+
+Preloads the app once in the parent, then forks N uvicorn workers (uvloop + httptools)
+that share the parent's listening socket and its copy-on-write memory.
+
+Run from the day7 directory:
+  python server.py
+
+Configuration (environment variables):
+  WEB_WORKERS    number of worker processes (default: CPU count)
+  HOST / PORT    bind address (default: 0.0.0.0:8000)
+  UVICORN_LOOP   event loop implementation (default: uvloop)
+  UVICORN_HTTP   HTTP protocol implementation (default: httptools)
+  LOG_LEVEL      uvicorn log level (default: info)
+  WORKER_RESTART_MAX_DELAY  longest wait before re-forking a crashing worker, in
+                 seconds (default: 30)
+
+A worker that exits is re-forked. If it dies within WORKER_MIN_UPTIME seconds of
+starting, the next restart waits twice as long as the last one (0.5s, 1s, 2s, ...
+up to WORKER_RESTART_MAX_DELAY), so a worker that fails at startup (bad config,
+database down) doesn't turn into a fork loop. A worker that stayed up resets it.
+"""
+
+import gc
+import logging
+import os
+import signal
+import time
+
+import uvicorn
+
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", os.cpu_count() or 1))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+UVICORN_LOOP = os.getenv("UVICORN_LOOP", "uvloop")
+UVICORN_HTTP = os.getenv("UVICORN_HTTP", "httptools")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+WORKER_RESTART_MAX_DELAY = float(os.getenv("WORKER_RESTART_MAX_DELAY", "30"))
+WORKER_MIN_UPTIME = 10.0
+WORKER_RESTART_FIRST_DELAY = 0.5
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn Server that reports how long the worker took to start after fork."""
+
+    def __init__(self, config: uvicorn.Config, forked_at: float) -> None:
+        super().__init__(config)
+        self.forked_at = forked_at
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        elapsed_ms = (time.perf_counter() - self.forked_at) * 1000
+        logger.info("Worker %d ready in %.1f ms after fork", os.getpid(), elapsed_ms)
+
+
+def preload_app():
+    """
+    Import the app (routers, models; create_all only with AUTO_CREATE_SCHEMA=1) before
+    forking. The schema check (database.check_schema) runs later, in each worker's lifespan.
+    gc.freeze() moves everything allocated so far into the permanent generation,
+    so the collector in each worker never writes to those pages and they stay shared.
+    """
+    started = time.perf_counter()
+    from main import app
+
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "Preloaded app in %.1f ms (%d objects frozen)",
+        (time.perf_counter() - started) * 1000,
+        gc.get_freeze_count(),
+    )
+    return app
+
+
+def describe_exit(status: int) -> str:
+    """os.wait() status as text: exit code, or the signal that killed the worker."""
+    code = os.waitstatus_to_exitcode(status)
+    if code < 0:
+        return f"killed by {signal.Signals(-code).name}"
+    return f"exit code {code}"
+
+
+def run_worker(app, sock, forked_at: float) -> None:
+    from database import engine
+
+    # Drop pooled connections inherited from the parent without closing them,
+    # the parent still owns those sockets. The worker opens its own connections.
+    engine.dispose(close=False)
+
+    config = uvicorn.Config(
+        app,
+        loop=UVICORN_LOOP,
+        http=UVICORN_HTTP,
+        log_level=LOG_LEVEL,
+    )
+    WorkerServer(config, forked_at).run(sockets=[sock])
+
+
+def main() -> None:
+    # Config is only used here to set up logging and bind the shared socket
+    bind_config = uvicorn.Config("main:app", host=HOST, port=PORT, log_level=LOG_LEVEL)
+    app = preload_app()
+    sock = bind_config.bind_socket()
+
+    # pid -> time.monotonic() when it was forked
+    workers: dict[int, float] = {}
+    shutting_down = False
+    restart_delay = 0.0
+
+    def spawn() -> None:
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                run_worker(app, sock, forked_at)
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        workers[pid] = time.monotonic()
+
+    def shutdown(signum, frame) -> None:
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    logger.info("Starting %d workers on http://%s:%d", WEB_WORKERS, HOST, PORT)
+    for _ in range(WEB_WORKERS):
+        spawn()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if shutting_down:
+            continue
+        uptime = time.monotonic() - started if started is not None else 0.0
+        if uptime < WORKER_MIN_UPTIME:
+            restart_delay = min(max(restart_delay * 2, WORKER_RESTART_FIRST_DELAY), WORKER_RESTART_MAX_DELAY)
+        else:
+            restart_delay = 0.0
+        logger.warning(
+            "Worker %d exited (%s) after %.1fs, restarting in %.1fs",
+            pid, describe_exit(status), uptime, restart_delay,
+        )
+        # Sleep in slices so SIGTERM during the backoff stops the supervisor promptly
+        restart_at = time.monotonic() + restart_delay
+        while not shutting_down and time.monotonic() < restart_at:
+            time.sleep(max(0.0, min(0.1, restart_at - time.monotonic())))
+        if not shutting_down:
+            spawn()
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Idempotency fingerprint test: the hash stored in idempotency_keys must not depend on
+the password, so the table holds nothing that can be brute-forced back into one.
+Exit code 1 on failure.
+
+Usage (from the day7 directory):
+  python test_idempotency.py
+  python -m pytest test_idempotency.py
+"""
+
+import sys
+
+from idempotency import request_hash
+from routers.auth import CreateUserRequest
+
+USER = {
+    "username": "regular_user", "email": "user@example.com", "first_name": "Regular",
+    "last_name": "User", "role": "user",
+}
+
+
+def test_hash_ignores_password() -> None:
+    first = request_hash(CreateUserRequest(**USER, password="correct horse"))
+    second = request_hash(CreateUserRequest(**USER, password="battery staple"))
+    assert first == second
+
+
+def test_hash_still_tells_requests_apart() -> None:
+    first = request_hash(CreateUserRequest(**USER, password="correct horse"))
+    other = request_hash(CreateUserRequest(**{**USER, "email": "other@example.com"}, password="correct horse"))
+    assert first != other
+
+
+def main() -> int:
+    failures = 0
+    for test in (test_hash_ignores_password, test_hash_still_tells_requests_apart):
+        try:
+            test()
+        except AssertionError:
+            failures += 1
+            print(f"FAIL  {test.__name__}")
+    print(f"2 tests, {failures} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
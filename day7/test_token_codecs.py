@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Token codec compatibility test: fails when the backends in token_codec.py stop
+being interchangeable.
+
+Every backend must decode the tokens every other backend issues (so TOKEN_CODEC can
+be switched on a running deployment without logging anybody out) and reject expired,
+forged, truncated and garbage tokens with TokenError. Exit code 1 on any failure.
+
+Usage (from the day7 directory):
+  python test_token_codecs.py
+  python -m pytest test_token_codecs.py
+"""
+
+import sys
+from datetime import timedelta
+
+from token_codec import TOKEN_CODECS, TokenError, get_token_codec
+
+SECRET_KEY = "9b2468f687b8e512948ff1811854779f9a5dd772635513c9df497e359bc1176b"
+OTHER_KEY = "0" * 64
+CLAIMS = {"sub": "regular_user", "id": 42, "role": "user"}
+
+
+def check_compatibility() -> list[str]:
+    """Decode every backend's tokens with every backend; returns the failures."""
+    failures = []
+    codecs = {name: get_token_codec(SECRET_KEY, name) for name in TOKEN_CODECS}
+    for enc_name, encoder in codecs.items():
+        token = encoder.encode(CLAIMS, timedelta(minutes=20))
+        expired = encoder.encode(CLAIMS, timedelta(minutes=-1))
+        forged = get_token_codec(OTHER_KEY, enc_name).encode(CLAIMS, timedelta(minutes=20))
+        for dec_name, decoder in codecs.items():
+            label = f"{enc_name} -> {dec_name}"
+            try:
+                payload = decoder.decode(token)
+            except TokenError as e:
+                failures.append(f"{label}: rejected a valid token ({e})")
+                continue
+            if {k: payload.get(k) for k in CLAIMS} != CLAIMS:
+                failures.append(f"{label}: claims changed: {payload}")
+            if not isinstance(payload.get("exp"), int):
+                failures.append(f"{label}: exp is not an integer: {payload.get('exp')!r}")
+            for kind, bad in (("expired", expired), ("forged", forged), ("truncated", token[:-2]), ("garbage", "not-a-token")):
+                try:
+                    decoder.decode(bad)
+                except TokenError:
+                    continue
+                except Exception as e:
+                    failures.append(f"{label}: {kind} token raised {type(e).__name__} instead of TokenError")
+                    continue
+                failures.append(f"{label}: accepted a {kind} token")
+    return failures
+
+
+def test_codecs_are_interchangeable() -> None:
+    assert check_compatibility() == []
+
+
+def main() -> int:
+    failures = check_compatibility()
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    pairs = len(TOKEN_CODECS) ** 2
+    print(f"{pairs} encoder/decoder pairs, {len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
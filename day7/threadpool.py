@@ -0,0 +1,99 @@
+"""
+Handler execution mode and threadpool sizing.
+
+The routes call synchronous SQLAlchemy and bcrypt. HANDLER_MODE picks where that runs:
+
+    async (default)  handlers run as `async def` on the event loop, as they always have;
+                     every query or password hash blocks the whole worker while it runs
+    sync             handlers marked @sync_handler are registered as plain `def`, so
+                     FastAPI runs them on AnyIO's worker threads and the loop stays free
+
+In sync mode the number of worker threads must match the DB pool. With more threads
+than connections, the extra threads just wait in the pool for up to pool_timeout;
+with fewer, connections sit idle while requests queue for a thread.
+configure_threadpool() therefore sizes AnyIO's default capacity limiter to
+pool_size + max_overflow of database.engine, unless THREADPOOL_SIZE overrides it.
+In async mode the limiter keeps AnyIO's default (40 threads) unless THREADPOOL_SIZE
+is set explicitly.
+
+The limiter is shared with everything else using anyio.to_thread / run_in_threadpool
+(the get_db dependency, the write batcher, revocation refreshes). threadpool_stats()
+reports busy threads and the number of calls queued for one.
+"""
+
+import functools
+import logging
+import os
+
+import anyio.to_thread
+
+HANDLER_MODE = os.getenv("HANDLER_MODE", "async")
+# Worker threads for AnyIO's default limiter; defaults to the DB pool capacity
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "0")) or None
+
+if HANDLER_MODE not in ("async", "sync"):
+    raise ValueError(f"HANDLER_MODE must be 'async' or 'sync', got {HANDLER_MODE!r}")
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def sync_handler(fn):
+    """
+    Mark a route handler whose body is blocking (plain `def`, sync DB / bcrypt calls).
+
+    sync mode:  returned unchanged, FastAPI runs it on the threadpool.
+    async mode: wrapped in an `async def` that calls it inline on the event loop.
+    Put it below the @router decorator.
+    """
+    if HANDLER_MODE == "sync":
+        return fn
+
+    @functools.wraps(fn)
+    async def on_event_loop(*args, **kwargs):
+        return fn(*args, **kwargs)
+
+    return on_event_loop
+
+
+def pool_capacity(engine) -> int | None:
+    """pool_size + max_overflow of engine's pool, or None for pools without a fixed limit."""
+    pool = engine.pool
+    if not hasattr(pool, "size"):
+        return None
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    if max_overflow < 0:
+        return None  # unlimited overflow
+    return pool.size() + max_overflow
+
+
+def configure_threadpool(engine, size: int | None = THREADPOOL_SIZE) -> int:
+    """Size the running loop's default thread limiter. Call once per worker at startup."""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    capacity = pool_capacity(engine)
+    if size is None and HANDLER_MODE != "sync":
+        # Handlers run on the loop; leave the limiter alone for def dependencies and offloads
+        size = int(limiter.total_tokens)
+        logger.info("Handler mode %s, threadpool size %d (default)", HANDLER_MODE, size)
+        return size
+    if size is None:
+        size = capacity or int(limiter.total_tokens)
+    elif capacity is not None and size > capacity:
+        logger.warning(
+            "THREADPOOL_SIZE=%d is above the DB pool capacity %d; handler threads will queue on pool_timeout",
+            size,
+            capacity,
+        )
+    limiter.total_tokens = size
+    logger.info("Handler mode %s, threadpool size %d (DB pool capacity %s)", HANDLER_MODE, size, capacity)
+    return size
+
+
+def threadpool_stats() -> dict:
+    """Limiter usage for the running loop's default threadpool."""
+    stats = anyio.to_thread.current_default_thread_limiter().statistics()
+    return {
+        "mode": HANDLER_MODE,
+        "size": int(stats.total_tokens),
+        "busy": stats.borrowed_tokens,
+        "queued": stats.tasks_waiting,
+    }
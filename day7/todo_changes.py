@@ -0,0 +1,95 @@
+"""
+Change versions for delta sync (GET /todo/changes?since=<version>).
+
+Every create/update stores the next value of its owner's change counter in
+Todos.version, and every delete writes a TodoTombstones row with its own version.
+
+Versions come from a counter row per owner ("todos:<owner_id>", UPDATE ... RETURNING)
+instead of a database sequence on purpose: the row lock is held until the writing
+transaction commits, so an owner's versions become visible in increasing order. A
+client holding watermark N can therefore never miss a change with version <= N that
+commits later. Delta sync only ever reads one owner's changes, so writes only queue
+behind other writes of the same user, not behind everybody's.
+
+An owner's row is created on their first write (INSERT ... ON CONFLICT DO NOTHING, so
+two concurrent first writes both succeed). It starts from the old global "todos"
+counter, which every version handed out before per-owner counters is below.
+"""
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import ChangeCounters, TodoTombstones
+
+# Counter from before per-owner counters; only read now, as the floor for new ones
+LEGACY_COUNTER_NAME = "todos"
+
+
+def counter_name(owner_id: int) -> str:
+    return f"todos:{owner_id}"
+
+
+def _dialect_insert(db):
+    dialect = db.dialect if hasattr(db, "dialect") else db.get_bind().dialect
+    return postgresql.insert if dialect.name == "postgresql" else sqlite.insert
+
+
+def _legacy_floor():
+    return func.coalesce(
+        select(ChangeCounters.value).where(ChangeCounters.name == LEGACY_COUNTER_NAME).scalar_subquery(), 0
+    )
+
+
+def _bump(db, name: str, count: int) -> int | None:
+    return db.execute(
+        update(ChangeCounters)
+        .where(ChangeCounters.name == name)
+        .values(value=ChangeCounters.value + count)
+        .returning(ChangeCounters.value)
+    ).scalar_one_or_none()
+
+
+def next_todo_version(db, owner_id: int, count: int = 1) -> int:
+    """
+    Reserve `count` versions for owner_id and return the last one. Works with a Session or a Connection.
+    """
+    name = counter_name(owner_id)
+    last = _bump(db, name, count)
+    if last is None:
+        # Owner's first write: create the row (a concurrent first write may win, that's fine)
+        db.execute(
+            _dialect_insert(db)(ChangeCounters)
+            .values(name=name, value=_legacy_floor())
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        last = _bump(db, name, count)
+    return last
+
+
+def assign_todo_versions(conn, rows: list[dict]) -> None:
+    """WriteBatcher hook: give every row in a batch its own version, one UPDATE per owner."""
+    by_owner: dict[int, list[dict]] = {}
+    for row in rows:
+        by_owner.setdefault(row["owner_id"], []).append(row)
+    # Lock counters in a fixed order so two batches can't deadlock on each other
+    for owner_id in sorted(by_owner):
+        owner_rows = by_owner[owner_id]
+        last = next_todo_version(conn, owner_id, len(owner_rows))
+        first = last - len(owner_rows) + 1
+        for offset, row in enumerate(owner_rows):
+            row["version"] = first + offset
+
+
+def record_todo_tombstone(db, todo_id: int, owner_id: int) -> None:
+    db.merge(TodoTombstones(id=todo_id, owner_id=owner_id, version=next_todo_version(db, owner_id)))
+
+
+def current_todo_version(db, owner_id: int) -> int:
+    return db.execute(
+        select(
+            func.coalesce(
+                select(ChangeCounters.value).where(ChangeCounters.name == counter_name(owner_id)).scalar_subquery(),
+                _legacy_floor(),
+            )
+        )
+    ).scalar()
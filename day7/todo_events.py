@@ -0,0 +1,154 @@
+"""
+Todo change feed (create / update / delete events per owner).
+
+Write paths call todo_events.publish(db, ...) before db.commit(). Events are only
+delivered once the transaction commits:
+    - PostgreSQL: publish runs pg_notify() inside the transaction. Each worker keeps ONE
+      dedicated LISTEN connection and fans notifications out to its local subscribers,
+      so every worker sees writes made by any other worker.
+    - SQLite / single node: events are queued on the session and dispatched to local
+      subscribers from the session's after_commit hook (dropped on rollback).
+
+Subscribers are asyncio queues, so one worker can hold thousands of open streams.
+"""
+
+import asyncio
+import json
+import logging
+
+from sqlalchemy import event, text
+
+from database import engine, SessionLocal
+
+logger = logging.getLogger("uvicorn.error")
+
+CHANNEL = "todo_changes"
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscriber:
+    def __init__(self, owner_id: int) -> None:
+        self.owner_id = owner_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Set when events were dropped because the client is not reading fast enough
+        self.overflowed = False
+
+    def deliver(self, message: dict) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class InProcessTodoEventBus:
+    def __init__(self) -> None:
+        self.subscribers: dict[int, set[Subscriber]] = {}
+        event.listen(SessionLocal, "after_commit", self._after_commit)
+        event.listen(SessionLocal, "after_soft_rollback", self._after_rollback)
+
+    # ---------- publishing ----------
+
+    def publish(self, db, owner_id: int, event_type: str, todo_id: int) -> None:
+        db.info.setdefault("todo_events", []).append(
+            {"type": event_type, "id": todo_id, "owner_id": owner_id}
+        )
+
+    def _after_commit(self, session) -> None:
+        for message in session.info.pop("todo_events", ()):
+            self.dispatch(message)
+
+    def _after_rollback(self, session, previous_transaction) -> None:
+        session.info.pop("todo_events", None)
+
+    def dispatch(self, message: dict) -> None:
+        for subscriber in tuple(self.subscribers.get(message["owner_id"], ())):
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is subscriber.loop:
+                subscriber.deliver(message)
+            else:
+                # Commit happened on a threadpool thread
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, message)
+
+    # ---------- subscribing ----------
+
+    async def subscribe(self, owner_id: int) -> Subscriber:
+        subscriber = Subscriber(owner_id)
+        self.subscribers.setdefault(owner_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        owner_subscribers = self.subscribers.get(subscriber.owner_id)
+        if owner_subscribers is not None:
+            owner_subscribers.discard(subscriber)
+            if not owner_subscribers:
+                del self.subscribers[subscriber.owner_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self.subscribers.values())
+
+
+class PostgresTodoEventBus(InProcessTodoEventBus):
+    def __init__(self, engine) -> None:
+        super().__init__()
+        self.engine = engine
+        self._listen_conn = None
+
+    def publish(self, db, owner_id: int, event_type: str, todo_id: int) -> None:
+        # Delivered by Postgres when (and only if) the surrounding transaction commits
+        payload = json.dumps({"type": event_type, "id": todo_id, "owner_id": owner_id})
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+    def _after_commit(self, session) -> None:
+        # Nothing is queued locally, the LISTEN connection delivers our own events too
+        pass
+
+    async def subscribe(self, owner_id: int) -> Subscriber:
+        if self._listen_conn is None:
+            self._start_listener()
+        return await super().subscribe(owner_id)
+
+    def _start_listener(self) -> None:
+        # A pooled connection detached for good, so the pool does not lose a slot
+        pooled = self.engine.raw_connection()
+        pooled.detach()
+        conn = pooled.dbapi_connection
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        asyncio.get_running_loop().add_reader(conn.fileno(), self._on_notify)
+        self._listen_conn = conn
+
+    def _restart_listener(self) -> None:
+        try:
+            self._start_listener()
+        except Exception:
+            logger.exception("Could not re-establish LISTEN connection, retrying")
+            asyncio.get_running_loop().call_later(5.0, self._restart_listener)
+
+    def _on_notify(self) -> None:
+        conn = self._listen_conn
+        try:
+            conn.poll()
+        except Exception:
+            logger.exception("LISTEN connection lost, reconnecting")
+            loop = asyncio.get_running_loop()
+            loop.remove_reader(conn.fileno())
+            self._listen_conn = None
+            loop.call_later(1.0, self._restart_listener)
+            return
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            self.dispatch(json.loads(notify.payload))
+
+
+def get_todo_event_bus(engine) -> InProcessTodoEventBus:
+    if engine.dialect.name == "postgresql":
+        return PostgresTodoEventBus(engine)
+    return InProcessTodoEventBus()
+
+
+todo_events = get_todo_event_bus(engine)
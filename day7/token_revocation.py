@@ -0,0 +1,159 @@
+"""
+Access token revocation.
+
+Revocations are written to the revoked_tokens table and mirrored in memory by every
+worker. get_current_user only checks the in-memory copy (a set lookup and a dict
+lookup), so the hot path never waits on the database.
+
+The in-memory copy is reloaded from the table in the background every
+REVOCATION_REFRESH_SECONDS, which bounds how long a token revoked on another worker
+stays usable there. Revocations made on this worker apply immediately, and ones made
+while a reload is querying are replayed onto its snapshot so the swap can't drop them.
+
+Revoking a user rejects their tokens issued strictly before the revoke, to the
+millisecond (tokens carry iat in milliseconds), so logging in again right after a
+revoke gives a working token even within the same second.
+
+Only unexpired entries are kept, so the set stays small and a plain set is
+cheaper than a Bloom filter (no false positives to re-check).
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+
+import anyio
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import RevokedTokens
+
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def now_ms() -> int:
+    """Current time in epoch milliseconds: revocation cutoffs, and iat * 1000 of new tokens."""
+    return time.time_ns() // 1_000_000
+
+
+def issued_at_ms(payload: dict) -> int:
+    """A token's iat claim (epoch seconds, with milliseconds as decimals) in milliseconds."""
+    return round(payload.get("iat", 0) * 1000)
+
+
+class RevocationList:
+    def __init__(self, refresh_seconds: float = REVOCATION_REFRESH_SECONDS) -> None:
+        self.refresh_seconds = refresh_seconds
+        self.revoked_jtis: set[str] = set()
+        # user_id -> tokens with iat before this time (epoch milliseconds) are revoked
+        self.user_not_before: dict[int, int] = {}
+        self._loaded = False
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._task = None
+        self._initial_load = None
+        # Local revocations since the running reload started: (jti, user_id, not_before_ms)
+        self._during_refresh: list[tuple] = []
+
+    # ---------- hot path ----------
+
+    def is_revoked(self, payload: dict) -> bool:
+        jti = payload.get("jti")
+        if jti is not None and jti in self.revoked_jtis:
+            return True
+        not_before = self.user_not_before.get(payload.get("id"))
+        return not_before is not None and issued_at_ms(payload) < not_before
+
+    async def maybe_refresh(self) -> None:
+        """Called per request; starts a background reload when the copy is stale."""
+        if not self._loaded:
+            # First requests on this worker wait for the load so nothing slips through;
+            # it runs on a thread, and concurrent first requests share it
+            if self._initial_load is None or self._initial_load.done():
+                self._initial_load = asyncio.get_running_loop().create_task(
+                    anyio.to_thread.run_sync(self.refresh), context=contextvars.Context()
+                )
+            await asyncio.shield(self._initial_load)
+            return
+        if self._refreshing or time.monotonic() < self._next_refresh:
+            return
+        self._refreshing = True
+        # Fresh context: not bound to the deadline of the request that triggered it
+        self._task = asyncio.get_running_loop().create_task(
+            self._refresh_in_background(), context=contextvars.Context()
+        )
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await anyio.to_thread.run_sync(self.refresh)
+        except Exception:
+            logger.exception("Could not refresh token revocation list")
+        finally:
+            self._refreshing = False
+
+    def refresh(self) -> None:
+        now = int(time.time())
+        with self._lock:
+            self._during_refresh = []
+        with SessionLocal() as db:
+            rows = db.query(RevokedTokens).filter(RevokedTokens.expires_at > now).all()
+        jtis = {row.jti for row in rows if row.jti is not None}
+        not_before: dict[int, int] = {}
+        for row in rows:
+            if row.user_id is not None:
+                # Rows from before migration 0003 only have the second (iat <= not_before)
+                cutoff = row.not_before_ms if row.not_before_ms is not None else (row.not_before + 1) * 1000
+                not_before[row.user_id] = max(cutoff, not_before.get(row.user_id, 0))
+        with self._lock:
+            # The query may have missed revocations committed here while it ran
+            for jti, user_id, cutoff in self._during_refresh:
+                if jti is not None:
+                    jtis.add(jti)
+                else:
+                    not_before[user_id] = max(cutoff, not_before.get(user_id, 0))
+            # Swap whole objects so readers never see a half-built set
+            self.revoked_jtis = jtis
+            self.user_not_before = not_before
+            self._loaded = True
+            self._next_refresh = time.monotonic() + self.refresh_seconds
+
+    # ---------- writes (logout / admin) ----------
+
+    def revoke_token(self, db: Session, jti: str, expires_at: int) -> None:
+        self._prune(db)
+        if db.query(RevokedTokens).filter(RevokedTokens.jti == jti).first() is None:
+            db.add(RevokedTokens(jti=jti, expires_at=expires_at))
+        db.commit()
+        with self._lock:
+            self.revoked_jtis = self.revoked_jtis | {jti}
+            self._during_refresh.append((jti, None, None))
+
+    def revoke_user(self, db: Session, user_id: int, token_lifetime_seconds: int) -> None:
+        cutoff_ms = now_ms()
+        now = cutoff_ms // 1000
+        self._prune(db)
+        db.add(
+            RevokedTokens(
+                user_id=user_id,
+                not_before=now,
+                not_before_ms=cutoff_ms,
+                expires_at=now + token_lifetime_seconds + 1,
+            )
+        )
+        db.commit()
+        with self._lock:
+            cutoff = max(cutoff_ms, self.user_not_before.get(user_id, 0))
+            self.user_not_before = {**self.user_not_before, user_id: cutoff}
+            self._during_refresh.append((None, user_id, cutoff_ms))
+
+    def _prune(self, db: Session) -> None:
+        db.query(RevokedTokens).filter(RevokedTokens.expires_at <= int(time.time())).delete()
+
+
+revocation_list = RevocationList()
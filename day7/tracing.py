@@ -0,0 +1,415 @@
+"""
+Request tracing in OpenTelemetry (OTLP/JSON) format.
+
+Each sampled request produces one trace:
+    GET /todo/{todo_id}            root span (TracingMiddleware)
+      get_current_user             dependency spans (trace_span in the dependency)
+      get_db
+      handler read_todo            endpoint body (TracedRoute)
+        SELECT                     one span per SQL statement (instrument_engine)
+      get_db.close
+    bcrypt.checkpw / bcrypt.hashpw get their own spans in routers/auth.py
+
+Every response carries the trace id, sampled or not:
+    traceparent: 00-<trace id>-<root span id>-<01 sampled | 00 not sampled>
+    X-Trace-Id:  <trace id>
+An incoming W3C traceparent header's trace id is reused, so traces join up with the
+caller's. Its sampled flag is only a request: a caller-sampled request is traced with
+probability TRACE_PARENT_SAMPLE_RATE, so clients can't force every request they send
+into the exporter.
+
+Configuration (env variables):
+    TRACE_SAMPLE_RATE   fraction of requests to trace, 0.0 - 1.0 (default 0)
+    TRACE_PARENT_SAMPLE_RATE
+                        fraction of requests whose traceparent says sampled that are
+                        traced (default: TRACE_SAMPLE_RATE; 1.0 behind a trusted gateway)
+    TRACE_EXPORT_FILE   append finished traces here, one OTLP JSON request per line
+                        (default traces.jsonl)
+    TRACE_EXPORT_MAX_BYTES
+                        rotate the file to <file>.1 once it reaches this size, keeping
+                        one old file (default 100 MB)
+    TRACE_EXPORT_URL    POST traces to an OTLP/HTTP collector instead,
+                        e.g. http://localhost:4318/v1/traces
+    TRACE_SERVICE_NAME  service.name resource attribute (default todosapp)
+
+Unsampled requests cost one contextvar lookup per would-be span. Export runs on
+a background thread, in batches, and drops spans rather than block requests when
+the exporter falls behind.
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import Headers, MutableHeaders
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_PARENT_SAMPLE_RATE = float(os.getenv("TRACE_PARENT_SAMPLE_RATE", str(TRACE_SAMPLE_RATE)))
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "traces.jsonl")
+TRACE_EXPORT_MAX_BYTES = int(os.getenv("TRACE_EXPORT_MAX_BYTES", str(100 * 1024 * 1024)))
+TRACE_EXPORT_URL = os.getenv("TRACE_EXPORT_URL")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "todosapp")
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+MAX_STATEMENT_LENGTH = 1000
+
+logger = logging.getLogger("uvicorn.error")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error", "root", "spans")
+
+    def __init__(self, trace_id: str, name: str, kind: int, parent=None, parent_id: str | None = None) -> None:
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = {}
+        self.error = None
+        # Every span of a trace is collected on its root, exported when the root ends
+        self.root = parent.root if parent is not None else self
+        self.spans = [] if parent is None else None
+
+    def finish(self) -> None:
+        self.end = time.time_ns()
+        # Spans finishing after their root was exported are dropped;
+        # list.append is atomic, child spans may finish on threadpool threads
+        if self.root is self or self.root.end is None:
+            self.root.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+@contextmanager
+def trace_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Record a child span of the current span; does nothing when the request isn't sampled."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = Span(parent.trace_id, name, kind, parent)
+    span.attributes.update(attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish()
+
+
+# ==================== EXPORT ====================
+
+
+class FileSpanExporter:
+    """
+    Appends each batch as one OTLP ExportTraceServiceRequest JSON line. Once the file
+    reaches max_bytes it is renamed to <path>.1 (replacing the previous one), so the
+    traces on disk never take more than about 2 * max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = TRACE_EXPORT_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def export(self, payload: dict) -> None:
+        try:
+            if os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            pass  # not written yet, or another worker rotated it first
+        with open(self.path, "a") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """POSTs each batch to an OTLP/HTTP collector (JSON encoding)."""
+
+    def __init__(self, url: str, timeout: float = 5.0) -> None:
+        self.url = url
+        self.timeout = timeout
+
+    def export(self, payload: dict) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class BatchSpanProcessor:
+    """Queues finished traces and exports them in batches from a background thread."""
+
+    def __init__(self, exporter, max_queue: int = 2048, max_batch: int = 512, interval: float = 1.0) -> None:
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.interval = interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def on_trace_end(self, spans: list) -> None:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _ensure_thread(self) -> None:
+        # Started lazily so a forked worker gets its own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            traces = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while sum(map(len, traces)) < self.max_batch:
+                try:
+                    traces.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._export([span for spans in traces for span in spans])
+            for _ in traces:
+                self._queue.task_done()
+
+    def _export(self, spans: list) -> None:
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", TRACE_SERVICE_NAME)]},
+                    "scopeSpans": [{"scope": {"name": "todosapp.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+                }
+            ]
+        }
+        try:
+            self.exporter.export(payload)
+            self.exported += len(spans)
+        except Exception:
+            self.failed += len(spans)
+            logger.warning("Trace export failed, dropped %d spans", len(spans), exc_info=True)
+
+    def flush(self) -> None:
+        """Block until every queued trace has been exported (for scripts and tests)."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+
+span_processor = BatchSpanProcessor(
+    OTLPHttpSpanExporter(TRACE_EXPORT_URL) if TRACE_EXPORT_URL else FileSpanExporter(TRACE_EXPORT_FILE)
+)
+
+
+# ==================== INSTRUMENTATION ====================
+
+
+def parse_traceparent(value: str | None):
+    """Return (trace_id, parent_span_id, sampled) from a W3C traceparent header, or None."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[1] == "0" * 32:
+        return None
+    try:
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class TracingMiddleware:
+    def __init__(
+        self,
+        app,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        processor: BatchSpanProcessor = span_processor,
+        parent_sample_rate: float = TRACE_PARENT_SAMPLE_RATE,
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.parent_sample_rate = parent_sample_rate
+        self.processor = processor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = parse_traceparent(Headers(scope=scope).get("traceparent"))
+        if incoming is not None:
+            trace_id, parent_id, parent_sampled = incoming
+            sampled = parent_sampled and random.random() < self.parent_sample_rate
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+
+        root = Span(trace_id, f"{scope['method']} {scope['path']}", SPAN_KIND_SERVER, parent_id=parent_id)
+        root.attributes.update({"http.request.method": scope["method"], "url.path": scope["path"]})
+        traceparent = f"00-{trace_id}-{root.span_id}-{'01' if sampled else '00'}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.response.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    root.error = f"HTTP {message['status']}"
+                headers = MutableHeaders(scope=message)
+                headers["traceparent"] = traceparent
+                headers["X-Trace-Id"] = trace_id
+            await send(message)
+
+        if not sampled:
+            await self.app(scope, receive, send_wrapper)
+            return
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            root.finish()
+            self.processor.on_trace_end(root.spans)
+
+
+class TracedRoute(APIRoute):
+    """
+    APIRoute that records the endpoint body as a "handler" span and names the
+    root span after the route template (GET /todo/{todo_id}).
+
+    Usage: APIRouter(..., route_class=TracedRoute)
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs) -> None:
+        # include_router() re-creates routes from route.endpoint; wrap only once
+        if not getattr(endpoint, "__traced__", False):
+            endpoint = _traced_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def traced_handler(request):
+            span = _current_span.get()
+            if span is not None:
+                span.root.name = f"{request.method} {route}"
+                span.root.attributes["http.route"] = route
+            return await handler(request)
+
+        return traced_handler
+
+
+def _traced_endpoint(endpoint):
+    name = f"handler {endpoint.__name__}"
+    attributes = {"code.function": endpoint.__name__}
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            with trace_span(name, **attributes):
+                return await endpoint(*args, **kwargs)
+
+    else:
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            with trace_span(name, **attributes):
+                return endpoint(*args, **kwargs)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def instrument_engine(engine) -> None:
+    """Record every SQL statement run through engine as a client span."""
+    system = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = Span(parent.trace_id, statement.split(None, 1)[0].upper() if statement else "SQL", SPAN_KIND_CLIENT, parent)
+        span.attributes.update(
+            {"db.system": system, "db.statement": statement[:MAX_STATEMENT_LENGTH], "db.executemany": executemany}
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            span = spans.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.attributes["db.rowcount"] = cursor.rowcount
+            span.finish()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.error = f"{type(exception_context.original_exception).__name__}: {exception_context.original_exception}"
+            span.finish()
@@ -0,0 +1,159 @@
+"""
+Group-commit write batcher.
+
+Inserts submitted within a few milliseconds of each other are written with one
+multi-row INSERT ... RETURNING and a single commit, so a burst of create requests
+pays for one fsync (and, on SQLite, one write-lock acquisition) instead of one each.
+
+Only one flush runs at a time: rows arriving while a flush is in progress are
+queued and go out together in the next flush.
+
+Every caller awaits its own future and gets back its own primary key, or the
+exception for its own row if the batch had to be retried row by row.
+"""
+
+import asyncio
+import bisect
+import contextvars
+import os
+import time
+
+import anyio
+from sqlalchemy import insert
+
+# Set TODO_WRITE_BATCHING=1 to route create_todo through the batcher
+TODO_WRITE_BATCHING = os.getenv("TODO_WRITE_BATCHING", "0") == "1"
+TODO_BATCH_MAX_SIZE = int(os.getenv("TODO_BATCH_MAX_SIZE", "100"))
+TODO_BATCH_MAX_DELAY_MS = float(os.getenv("TODO_BATCH_MAX_DELAY_MS", "5"))
+
+
+class Histogram:
+    """Fixed-bucket histogram; each bucket counts observations <= its upper bound."""
+
+    def __init__(self, buckets: list[float]) -> None:
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> dict:
+        labels = [f"<={b:g}" for b in self.buckets] + [f">{self.buckets[-1]:g}"]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class WriteBatcher:
+    def __init__(
+        self,
+        engine,
+        model,
+        max_batch: int = 100,
+        max_delay_ms: float = 5.0,
+        before_insert=None,
+    ) -> None:
+        self.engine = engine
+        self.table = model.__table__
+        # Optional hook(conn, rows) run inside the insert transaction, e.g. to stamp versions
+        self.before_insert = before_insert
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._pending: list = []
+        self._timer = None
+        self._flushing = False
+        self._tasks: set = set()
+        self.flush_sizes = Histogram([1, 2, 5, 10, 20, 50, 100, 200, 500])
+        self.latency_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 250, 500, 1000])
+
+    async def submit(self, row: dict) -> int:
+        """Queue one row for insertion and wait for its primary key."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+        if not self._flushing:
+            if len(self._pending) >= self.max_batch:
+                self._start_flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_delay, self._start_flush)
+        return await future
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing or not self._pending:
+            return
+        batch = self._pending[: self.max_batch]
+        del self._pending[: self.max_batch]
+        self._flushing = True
+        # Fresh context: the flush serves many requests, not the one that happened to start it
+        # (keeps that request's deadline and trace out of the batch insert)
+        task = asyncio.get_running_loop().create_task(self._flush(batch), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, batch: list) -> None:
+        rows = [row for row, _, _ in batch]
+        try:
+            try:
+                results = await anyio.to_thread.run_sync(self._insert_many, rows)
+            except Exception:
+                # One bad row fails the whole statement; retry individually so
+                # every caller gets its own outcome
+                results = await anyio.to_thread.run_sync(self._insert_each, rows)
+
+            now = time.perf_counter()
+            self.flush_sizes.observe(len(batch))
+            for (_, future, submitted_at), result in zip(batch, results):
+                self.latency_ms.observe((now - submitted_at) * 1000)
+                if future.done():
+                    continue  # caller went away (request cancelled)
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except BaseException as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        finally:
+            self._flushing = False
+            if self._pending:
+                self._start_flush()
+
+    def _insert_many(self, rows: list[dict]) -> list[int]:
+        stmt = insert(self.table).returning(self.table.c.id, sort_by_parameter_order=True)
+        rows = [dict(row) for row in rows]
+        with self.engine.begin() as conn:
+            if self.before_insert is not None:
+                self.before_insert(conn, rows)
+            return [row.id for row in conn.execute(stmt, rows)]
+
+    def _insert_each(self, rows: list[dict]) -> list:
+        results = []
+        stmt = insert(self.table).returning(self.table.c.id)
+        for row in rows:
+            try:
+                with self.engine.begin() as conn:
+                    row = dict(row)
+                    if self.before_insert is not None:
+                        self.before_insert(conn, [row])
+                    results.append(conn.execute(stmt, row).scalar_one())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def snapshot(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "flush_size": self.flush_sizes.snapshot(),
+            "latency_ms": self.latency_ms.snapshot(),
+        }